@@ -1,29 +1,45 @@
 import json
-import google.generativeai as genai
 from dotenv import load_dotenv
-import os
 from datetime import datetime
-from collections import defaultdict
-import time
+import asyncio
+from clause_store import ClauseStore
+from candidate_pairs import CandidatePairGenerator, clause_content
+from llm_pool import LLMClientPool
 
 class SuccessionDataAnalyzer:
-    def __init__(self, input_file='succession_data_unified.json'):
+    def __init__(self, input_file='succession_data_unified.json', candidate_threshold=0.3, max_candidates=None,
+                 concurrency=5, requests_per_minute=60, models=None, pool=None):
+        """
+        Args:
+            candidate_threshold: Score local minimal (0-1) pour qu'une paire soit comparée par le modèle
+            max_candidates: Nombre maximal de paires envoyées au modèle (None = pas de limite)
+            concurrency: Nombre de comparaisons envoyées simultanément
+            requests_per_minute: Limite de débit par clé API
+            models: Modèles à utiliser à la place des clés de .env (ex: modèle factice pour les tests)
+            pool: LLMClientPool existant à partager (ex: pool avec horloge simulée pour les tests)
+        """
         print("Initialisation de l'analyseur...")
         load_dotenv()
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("Clé API Gemini non trouvée dans le fichier .env")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        if pool is not None:
+            self.pool = pool
+        elif models is None:
+            self.pool = LLMClientPool.from_gemini_env(requests_per_minute=requests_per_minute)
+        else:
+            self.pool = LLMClientPool(models, requests_per_minute=requests_per_minute)
+        print(f"✓ {len(self.pool)} clés API Gemini chargées")
+        self.concurrency = concurrency
         self.input_file = input_file
+        self.candidate_generator = CandidatePairGenerator(
+            threshold=candidate_threshold, max_candidates=max_candidates
+        )
+        self.store = ClauseStore(input_file)
         self.load_data()
 
     def load_data(self):
         """Charge les données JSON"""
         print(f"Chargement des données depuis {self.input_file}...")
         try:
-            with open(self.input_file, 'r', encoding='utf-8') as f:
-                self.data = json.load(f)
+            self.data = self.store.load()
             print(f"✓ {len(self.data.get('clauses', {}))} clauses chargées")
         except FileNotFoundError:
             raise FileNotFoundError(f"Fichier {self.input_file} non trouvé")
@@ -31,7 +47,7 @@ class SuccessionDataAnalyzer:
             raise ValueError(f"Le fichier {self.input_file} n'est pas un JSON valide")
 
     def save_data(self):
-        """Sauvegarde les données dans le fichier JSON"""
+        """Met à jour les statistiques et fusionne le journal dans le fichier JSON"""
         # Mettre à jour les statistiques
         self.data['metadata']['stats']['total_clauses'] = len(self.data['clauses'])
         self.data['metadata']['stats']['enriched_clauses'] = sum(
@@ -44,36 +60,58 @@ class SuccessionDataAnalyzer:
         )
         self.data['metadata']['last_update'] = datetime.now().isoformat()
 
-        with open(self.input_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
+        self.store.compact()
         print(f"✓ Données sauvegardées dans {self.input_file}")
 
     def find_duplicates(self):
         """Trouve les clauses potentiellement en double"""
+        return asyncio.run(self.find_duplicates_async())
+
+    async def find_duplicates_async(self, on_result=None):
+        """Compare les paires candidates en parallèle et retourne les doublons potentiels
+        
+        Args:
+            on_result: Fonction appelée avec chaque résultat non nul dès qu'il est disponible
+        """
         print("Recherche des doublons potentiels...")
         duplicates = []
         
-        clauses = list(self.data['clauses'].items())
-        for i, (key1, clause1) in enumerate(clauses[:-1]):
-            for key2, clause2 in clauses[i+1:]:
+        # Pré-filtrage local : seules les paires candidates sont comparées par le modèle
+        candidates = self.candidate_generator.generate(self.data['clauses'])
+        self.candidate_generator.print_report()
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def compare(key1, key2):
+            async with semaphore:
                 # Comparer uniquement le contenu, pas les métadonnées
-                similarity_score = self.compare_clauses(
-                    clause1['content'],
-                    clause2['content']
+                score = await self.compare_clauses_async(
+                    clause_content(self.data['clauses'][key1]),
+                    clause_content(self.data['clauses'][key2])
                 )
-                
-                if similarity_score > 0:  # Sauvegarder toutes les comparaisons non nulles
-                    duplicates.append({
-                        'key1': key1,
-                        'key2': key2,
-                        'similarity_score': similarity_score
-                    })
-                    
+                return key1, key2, score
+        
+        tasks = [compare(key1, key2) for key1, key2, _ in candidates]
+        for i, task in enumerate(asyncio.as_completed(tasks), 1):
+            key1, key2, similarity_score = await task
+            if similarity_score > 0:  # Sauvegarder toutes les comparaisons non nulles
+                result = {
+                    'key1': key1,
+                    'key2': key2,
+                    'similarity_score': similarity_score
+                }
+                duplicates.append(result)
+                if on_result:
+                    on_result(result)
+            if i % 50 == 0:
+                print(f"✓ {i}/{len(tasks)} comparaisons effectuées")
+        
+        self.pool.print_report()
         return sorted(duplicates, key=lambda x: x['similarity_score'], reverse=True)
 
-    def compare_clauses(self, clause1, clause2):
-        """Compare deux clauses et retourne un score de similarité"""
-        prompt = f"""Compare ces deux clauses de succession et donne un score de similarité entre 0 et 100.
+    def comparison_prompt(self, clause1, clause2):
+        """Construit le prompt de comparaison de deux clauses"""
+        return f"""Compare ces deux clauses de succession et donne un score de similarité entre 0 et 100.
         
 Clause 1:
 {json.dumps(clause1, ensure_ascii=False, indent=2)}
@@ -88,10 +126,20 @@ Prends en compte :
 - La similarité des références légales
 Ne te base pas sur la similarité exacte du texte, mais sur le sens juridique."""
 
+    def parse_score(self, response):
+        """Extrait le score de la réponse du modèle, limité entre 0 et 100"""
+        score = float(response.text.strip())
+        return min(max(score, 0), 100)
+
+    def compare_clauses(self, clause1, clause2):
+        """Compare deux clauses et retourne un score de similarité"""
+        return asyncio.run(self.compare_clauses_async(clause1, clause2))
+
+    async def compare_clauses_async(self, clause1, clause2):
+        """Compare deux clauses via le pool de clés (budgets, quarantaine et nouvelles tentatives sur 429)"""
         try:
-            response = self.model.generate_content(prompt)
-            score = float(response.text.strip())
-            return min(max(score, 0), 100)  # Limiter entre 0 et 100
+            response = await self.pool.generate(self.comparison_prompt(clause1, clause2))
+            return self.parse_score(response)
         except Exception as e:
             print(f"Erreur lors de la comparaison : {str(e)}")
             return 0
@@ -172,14 +220,14 @@ Ne te base pas sur la similarité exacte du texte, mais sur le sens juridique.""
                 merged = self.merge_clauses(clause1, clause2, dup['key1'], dup['key2'])
                 
                 # Remplacer la première clause par la version fusionnée
-                self.data['clauses'][dup['key1']] = merged
+                self.store.upsert(dup['key1'], merged)
                 # Supprimer la deuxième clause
-                del self.data['clauses'][dup['key2']]
+                self.store.delete(dup['key2'])
                 
                 print("✓ Fusion effectuée")
-                
-                # Sauvegarder régulièrement
-                self.save_data()
+        
+        # Fusionner le journal des modifications dans le fichier
+        self.save_data()
         
         print("\n=== Analyse terminée ===")
         print(f"✓ {len(self.data['clauses'])} clauses restantes après fusion")
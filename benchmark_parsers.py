@@ -0,0 +1,127 @@
+import io
+import os
+import glob
+import gzip
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+from bs4 import BeautifulSoup
+import parsers
+
+# Pages BOFiP enregistrées avec le dépôt (structure des pages réelles, contenu réduit)
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'bofip')
+
+def legacy_extract_bofip_page(content, current_url, features=parsers.HTML_PARSER):
+    """Ancienne extraction (un parcours de l'arbre par information), conservée comme référence"""
+    soup = BeautifulSoup(content, features)
+
+    title = ""
+    title_elem = soup.find('h1')
+    if title_elem:
+        title = title_elem.get_text(strip=True)
+        if not any(x in title.lower() for x in parsers.IGNORED_TITLES):
+            title = ' '.join(title.split())
+
+    sections = []
+    for section in soup.find_all(['h1', 'h2', 'h3']):
+        section_title = section.get_text(strip=True)
+        if section_title and not any(x in section_title.lower() for x in parsers.IGNORED_TITLES):
+            sections.append(f"\n## {' '.join(section_title.split())}")
+            next_elem = section.next_sibling
+            section_content = []
+            while next_elem and next_elem.name not in ['h1', 'h2', 'h3']:
+                if isinstance(next_elem, str):
+                    text = next_elem.strip()
+                    if text:
+                        section_content.append(text)
+                elif next_elem.name in ['p', 'div']:
+                    text = next_elem.get_text(strip=True)
+                    if text:
+                        section_content.append(text)
+                next_elem = next_elem.next_sibling
+            if section_content:
+                sections.append(' '.join(' '.join(section_content).split()))
+
+    document = None
+    if sections:
+        document = {'url': current_url, 'title': title, 'content': "\n\n".join(sections)}
+
+    new_urls = {}
+    for link in soup.find_all('a', href=True):
+        if link.get_text(strip=True) == 'Document suivant':
+            href = link.get('href')
+            if href and 'identifiant=' in href:
+                doc_id = href.split('identifiant=')[-1].split('%23')[0]
+                new_urls[f"{parsers.BOFIP_BASE_URL}/bofip/{doc_id}"] = parsers.PRIORITY_NEXT_DOCUMENT
+    for link in soup.find_all('a', href=True):
+        href = link.get('href')
+        text = link.get_text(strip=True)
+        if ('BOI-' in text or 'succession' in text.lower()) and href and href != current_url:
+            new_urls.setdefault(parsers.normalize_bofip_url(href), None)
+    for section in soup.find_all(['p', 'div']):
+        text = section.get_text(strip=True)
+        if 'BOI-' in text:
+            for url in parsers.extract_boi_references(text):
+                new_urls.setdefault(url, None)
+
+    new_urls.pop(current_url, None)
+    return document, new_urls
+
+def load_fixtures(directory):
+    """Charge les pages BOFiP d'un dossier : fichiers .html ou entrées du cache HTTP (.json.gz)"""
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.htm*'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            name = os.path.splitext(os.path.basename(path))[0]
+            fixtures.append((f"{parsers.BOFIP_BASE_URL}/bofip/{name}", f.read()))
+    for path in sorted(glob.glob(os.path.join(directory, '*.json.gz'))):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry.get('source') == 'bofip':
+            fixtures.append((entry['url'], entry['body']))
+    return fixtures
+
+def benchmark(extract, fixtures, features, repeat):
+    """Meilleur temps total (secondes) sur repeat passes, et résultats de la dernière passe"""
+    best = None
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            results = [extract(content, url, features) for url, content in fixtures]
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de l'extraction des pages BOFiP")
+    parser.add_argument('fixtures', nargs='?', default=FIXTURES_DIR,
+                        help="Dossier de pages BOFiP (.html) ou cache HTTP du scraper (ex: http_cache, "
+                             "défaut : fixtures/bofip)")
+    parser.add_argument('--repeat', type=int, default=5, help="Nombre de passes (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"Aucune page BOFiP trouvée dans {args.fixtures}")
+        return
+    size = sum(len(content) for _, content in fixtures)
+    print(f"✓ {len(fixtures)} pages BOFiP chargées ({size / 1024:.0f} Ko)")
+
+    features_list = [parsers.HTML_PARSER] + (['lxml'] if parsers.LXML_AVAILABLE else [])
+    for features in features_list:
+        legacy_time, legacy_results = benchmark(legacy_extract_bofip_page, fixtures, features, args.repeat)
+        single_time, single_results = benchmark(parsers.extract_bofip_page, fixtures, features, args.repeat)
+        # Les liens peuvent différer : l'ancienne extraction collait une référence BOI
+        # au texte du bloc suivant (BOI-ENR-DMTG-10-10 suivi de "20 mars" → BOI-ENR-DMTG-10-1020)
+        same_documents = sum(1 for a, b in zip(legacy_results, single_results) if a[0] == b[0])
+        same_links = sum(1 for a, b in zip(legacy_results, single_results) if a[1] == b[1])
+        print(f"\nParser {features} :")
+        print(f"  - Extraction en plusieurs parcours : {1000 * legacy_time / len(fixtures):.2f} ms/page")
+        print(f"  - Extraction en un parcours : {1000 * single_time / len(fixtures):.2f} ms/page "
+              f"({legacy_time / single_time:.1f}x)")
+        print(f"  - Documents identiques : {same_documents}/{len(fixtures)} pages")
+        print(f"  - Liens identiques : {same_links}/{len(fixtures)} pages")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import math
+import heapq
+from collections import Counter, defaultdict
+from candidate_pairs import normalize_text
+
+# Mots vides français (sans accents, comme les tokens normalisés)
+FRENCH_STOPWORDS = {
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'cet', 'cette', 'd', 'dans', 'de', 'des', 'du',
+    'elle', 'en', 'est', 'et', 'il', 'l', 'la', 'le', 'les', 'leur', 'leurs', 'lui', 'n',
+    'ne', 'ou', 'par', 'pas', 'pour', 'qu', 'que', 'qui', 's', 'sa', 'se', 'ses', 'son',
+    'sont', 'sur', 'un', 'une', 'y'
+}
+
+def tokenize(text):
+    """Découpe un texte français en termes : minuscules, sans accents ni élisions, sans mots vides
+
+    Les pluriels réguliers (-s, -x) sont ramenés au singulier.
+    """
+    terms = []
+    for word in normalize_text(text).split():
+        if word in FRENCH_STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word[-1] in 'sx' and word[-2] not in 'sx':
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+class BM25Index:
+    """Index inversé BM25 en mémoire sur plusieurs champs pondérés
+
+    Les termes de chaque champ sont comptés avec le poids du champ (titre plus
+    important que la description), puis les documents sont notés avec Okapi BM25.
+    """
+    def __init__(self, field_weights=None, k1=1.5, b=0.75):
+        self.field_weights = field_weights or {
+            'titre': 3.0,
+            'mots_cles': 2.0,
+            'cas_usage': 1.0,
+            'description': 1.0
+        }
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self.doc_lengths = []
+        self.metadata = []
+        self.postings = defaultdict(list)  # terme -> [(document, fréquence pondérée)]
+        self.total_length = 0.0  # somme des longueurs, pour une moyenne en O(1) par ajout
+        self.avg_length = 0.0
+
+    def add(self, doc_id, fields, metadata=None):
+        """Ajoute un document : fields est un dict champ -> texte (ou liste de textes)"""
+        frequencies = Counter()
+        for field, weight in self.field_weights.items():
+            value = fields.get(field) or ''
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(str(v) for v in value)
+            for term in tokenize(value):
+                frequencies[term] += weight
+        doc = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.metadata.append(metadata)
+        length = sum(frequencies.values())
+        self.doc_lengths.append(length)
+        for term, frequency in frequencies.items():
+            self.postings[term].append((doc, frequency))
+        self.total_length += length
+        self.avg_length = self.total_length / len(self.doc_lengths)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_ids) - df + 0.5) / (df + 0.5))
+
+    def search(self, query, top_k=10):
+        """Retourne les top_k documents [(identifiant, score, métadonnées)] par score décroissant"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc, frequency in postings:
+                norm = 1 - self.b + self.b * self.doc_lengths[doc] / self.avg_length
+                scores[doc] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[doc], score, self.metadata[doc]) for doc, score in best]
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fusionne plusieurs classements (listes d'identifiants) : score = somme des 1 / (k + rang)"""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,156 @@
+import re
+import random
+import unicodedata
+import zlib
+from collections import defaultdict
+from itertools import combinations
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+def normalize_text(text):
+    """Met en minuscules, supprime les accents et la ponctuation"""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', text))
+
+def shingles(text, k=2):
+    """Ensemble des k-grammes de mots d'un texte normalisé"""
+    words = normalize_text(text).split()
+    if len(words) <= k:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+class MinHasher:
+    """Signatures MinHash (hachage universel sur le CRC32 des shingles)"""
+    def __init__(self, num_perm=64, seed=42):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+
+    def signature(self, shingle_set):
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+        if not hashes:
+            return [MAX_HASH] * len(self.params)
+        return [min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+                for a, b in self.params]
+
+def estimated_jaccard(sig1, sig2):
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+def clause_content(clause):
+    """Contenu d'une clause (format unifié ou format brut du scraper)"""
+    return clause.get('content', clause)
+
+def blocking_terms(clause):
+    """Mots-clés et références normalisés utilisés pour le blocage"""
+    content = clause_content(clause)
+    terms = set()
+    for value in content.get('mots_cles', []) + content.get('references', []):
+        if isinstance(value, dict):
+            value = value.get('url') or value.get('titre', '')
+        value = normalize_text(value)
+        if value:
+            terms.add(value)
+    return terms
+
+class CandidatePairGenerator:
+    """Génère à faible coût les paires de clauses susceptibles d'être des doublons
+
+    Deux blocages sont combinés : LSH sur les signatures MinHash du titre et de la
+    description, et partage de mots-clés/références. Les paires candidates sont ensuite
+    notées localement et seules celles au-dessus du seuil sont conservées.
+    """
+    def __init__(self, num_perm=64, bands=16, shingle_size=2, min_shared_terms=2,
+                 max_term_frequency=50, threshold=0.3, max_candidates=None):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shared_terms = min_shared_terms
+        self.max_term_frequency = max_term_frequency  # Termes trop fréquents ignorés pour le blocage
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.stats = {}
+
+    def lsh_pairs(self, signatures):
+        """Paires partageant au moins une bande de signature identique"""
+        pairs = set()
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            start = band * self.rows
+            for key, sig in signatures.items():
+                buckets[tuple(sig[start:start + self.rows])].append(key)
+            for keys in buckets.values():
+                if len(keys) > 1:
+                    pairs.update(tuple(sorted(p)) for p in combinations(keys, 2))
+        return pairs
+
+    def keyword_pairs(self, terms):
+        """Paires partageant au moins min_shared_terms mots-clés ou références"""
+        index = defaultdict(list)
+        for key, key_terms in terms.items():
+            for term in key_terms:
+                index[term].append(key)
+        shared = defaultdict(int)
+        for keys in index.values():
+            if len(keys) > self.max_term_frequency:
+                continue
+            for pair in combinations(sorted(keys), 2):
+                shared[pair] += 1
+        return {pair for pair, count in shared.items() if count >= self.min_shared_terms}
+
+    def generate(self, clauses):
+        """Retourne les paires candidates [(key1, key2, score local)] triées par score décroissant
+
+        Args:
+            clauses: dict clé -> clause
+        """
+        n = len(clauses)
+        signatures = {}
+        terms = {}
+        for key, clause in clauses.items():
+            content = clause_content(clause)
+            text = f"{content.get('titre', '')} {content.get('description', '')}"
+            signatures[key] = self.hasher.signature(shingles(text, self.shingle_size))
+            terms[key] = blocking_terms(clause)
+
+        lsh = self.lsh_pairs(signatures)
+        keyword = self.keyword_pairs(terms)
+        blocked = lsh | keyword
+
+        scored = []
+        for key1, key2 in blocked:
+            similarity = estimated_jaccard(signatures[key1], signatures[key2])
+            union = terms[key1] | terms[key2]
+            overlap = len(terms[key1] & terms[key2]) / len(union) if union else 0.0
+            score = max(similarity, overlap)
+            if score >= self.threshold:
+                scored.append((key1, key2, score))
+        scored.sort(key=lambda x: x[2], reverse=True)
+
+        selected = scored[:self.max_candidates] if self.max_candidates else scored
+        total = n * (n - 1) // 2
+        self.stats = {
+            'total_pairs': total,
+            'lsh_pairs': len(lsh),
+            'keyword_pairs': len(keyword),
+            'pruned_by_blocking': total - len(blocked),
+            'pruned_by_threshold': len(blocked) - len(scored),
+            'pruned_by_limit': len(scored) - len(selected),
+            'candidates': len(selected)
+        }
+        return selected
+
+    def print_report(self):
+        """Affiche le nombre de paires éliminées à chaque étape"""
+        s = self.stats
+        print(f"✓ Paires possibles : {s['total_pairs']}")
+        print(f"  - Blocage LSH : {s['lsh_pairs']} paires, mots-clés/références : {s['keyword_pairs']} paires")
+        print(f"  - Éliminées par le blocage : {s['pruned_by_blocking']}")
+        print(f"  - Éliminées sous le seuil de {self.threshold} : {s['pruned_by_threshold']}")
+        if self.max_candidates:
+            print(f"  - Éliminées par la limite de {self.max_candidates} : {s['pruned_by_limit']}")
+        print(f"✓ Paires envoyées au modèle : {s['candidates']}")
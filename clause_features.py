@@ -0,0 +1,83 @@
+import re
+import json
+import hashlib
+
+# Termes juridiques recherchés dans la description
+LEGAL_TERMS = (
+    'succession', 'heritage', 'testament', 'legs', 'donation',
+    'usufruit', 'nue-propriete', 'reserve', 'quotite', 'partage',
+    'conjoint', 'enfant', 'descendant', 'ascendant', 'heritier'
+)
+
+# Mot-clé du titre ou de la description -> cas d'usage typique
+USE_CASES = {
+    'enfant': "protection des enfants",
+    'conjoint': "protection du conjoint survivant",
+    'remariage': "cas de remariage",
+    'entreprise': "transmission d'entreprise",
+    'mineur': "présence d'héritiers mineurs",
+    'handicap': "héritiers en situation de handicap",
+    'étranger': "biens situés à l'étranger",
+    'donation': "donations antérieures",
+    'testament': "présence d'un testament",
+    'usufruit': "démembrement de propriété"
+}
+DEFAULT_USE_CASE = "cas général de succession"
+
+def compile_matcher(terms):
+    """Expression unique trouvant toutes les occurrences (même chevauchantes) des termes"""
+    alternation = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))")
+
+LEGAL_TERMS_MATCHER = compile_matcher(LEGAL_TERMS)
+USE_CASES_MATCHER = compile_matcher(USE_CASES)
+
+def content_hash(clause):
+    """Hash du contenu d'une clause (format unifié ou format brut du scraper)"""
+    content = clause.get('content', clause)
+    serialized = json.dumps(content, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+def extract_features(clause, digest=None):
+    """Calcule les caractéristiques d'une clause utilisées pour l'indexation et la recherche
+
+    Returns:
+        dict avec content_hash, keywords (liste triée) et use_cases
+    """
+    content = clause.get('content', clause)
+    titre = content.get('titre', '').lower()
+    description = content.get('description', '').lower()
+
+    # Mots significatifs du titre, type et termes juridiques de la description
+    keywords = {w for w in titre.split() if len(w) > 3}
+    if content.get('type'):
+        keywords.add(content['type'].lower())
+    keywords.update(LEGAL_TERMS_MATCHER.findall(description))
+
+    # Cas d'usage détectés dans le titre et la description, dans l'ordre de USE_CASES
+    found = set(USE_CASES_MATCHER.findall(f"{titre} {description}"))
+    use_cases = [case for keyword, case in USE_CASES.items() if keyword in found]
+
+    return {
+        'content_hash': digest or content_hash(clause),
+        'keywords': sorted(keywords),
+        'use_cases': ", ".join(use_cases or [DEFAULT_USE_CASE])
+    }
+
+class FeatureCache:
+    """Caractéristiques des clauses en mémoire, indexées par hash de contenu"""
+    def __init__(self, features=None):
+        self.features = dict(features or {})  # hash -> caractéristiques
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clause):
+        digest = content_hash(clause)
+        features = self.features.get(digest)
+        if features is None:
+            self.misses += 1
+            features = extract_features(clause, digest)
+            self.features[digest] = features
+        else:
+            self.hits += 1
+        return features
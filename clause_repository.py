@@ -0,0 +1,311 @@
+import os
+import json
+import sqlite3
+from clause_store import ClauseStore
+from clause_features import content_hash, extract_features
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clauses (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    type TEXT,
+    titre TEXT,
+    description TEXT,
+    needs_update INTEGER,
+    quality_score REAL,
+    last_modified TEXT,
+    data TEXT NOT NULL,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_clauses_type ON clauses(type);
+CREATE INDEX IF NOT EXISTS idx_clauses_needs_update ON clauses(needs_update);
+CREATE INDEX IF NOT EXISTS idx_clauses_quality_score ON clauses(quality_score);
+CREATE INDEX IF NOT EXISTS idx_clauses_last_modified ON clauses(last_modified);
+CREATE INDEX IF NOT EXISTS idx_clauses_position ON clauses(position);
+
+CREATE TABLE IF NOT EXISTS clause_keywords (
+    keyword TEXT NOT NULL,
+    clause_id TEXT NOT NULL,
+    PRIMARY KEY (keyword, clause_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_clause_keywords_clause ON clause_keywords(clause_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS clauses_fts USING fts5(
+    titre, description, tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TABLE IF NOT EXISTS clause_features (
+    content_hash TEXT PRIMARY KEY,
+    features TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS repository_info (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def clause_fields(clause):
+    """Extrait les colonnes indexées d'une clause (format unifié ou format brut du scraper)"""
+    content = clause.get('content', clause)
+    metadata = clause.get('metadata', {})
+    enrichment = metadata.get('enrichment', {})
+    source = metadata.get('source', {})
+
+    if enrichment:
+        needs_update = enrichment.get('needs_update')
+    else:
+        # Format brut : la clause est à enrichir tant qu'elle n'a pas de date d'enrichissement
+        needs_update = 'date_enrichissement' not in content
+
+    last_modified = (source.get('last_modified')
+                     or content.get('date_modification')
+                     or content.get('derniere_modification'))
+
+    return {
+        'type': content.get('type'),
+        'titre': content.get('titre', ''),
+        'description': content.get('description', ''),
+        'needs_update': None if needs_update is None else int(bool(needs_update)),
+        'quality_score': enrichment.get('quality_score'),
+        'last_modified': last_modified,
+        'mots_cles': sorted({kw.strip().lower() for kw in content.get('mots_cles', []) if kw and kw.strip()})
+    }
+
+def fts_query(text):
+    """Construit une requête FTS5 (termes entre guillemets, combinés par OR)"""
+    terms = [t.replace('"', '""') for t in text.split() if t.strip()]
+    return ' OR '.join(f'"{t}"' for t in terms)
+
+class ClauseRepository:
+    """Dépôt SQLite des clauses avec index sur le type, les mots-clés et l'état d'enrichissement
+
+    La clause complète est conservée en JSON dans la colonne `data`, les autres colonnes
+    servent uniquement aux recherches. L'import/export JSON est donc sans perte.
+    Les caractéristiques calculées (voir clause_features) sont stockées par hash de
+    contenu et ne sont recalculées que lorsque le contenu d'une clause change.
+    """
+    def __init__(self, db_path='succession_clauses.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(clauses)")}
+        if 'content_hash' not in columns:
+            # Base créée avant le stockage des caractéristiques : forcer un réimport
+            with self.conn:
+                self.conn.execute("ALTER TABLE clauses ADD COLUMN content_hash TEXT")
+                self.conn.execute("DELETE FROM repository_info WHERE key = 'source_signature'")
+
+    @classmethod
+    def from_json(cls, json_path='succession_data_unified.json', db_path='succession_clauses.db'):
+        """Ouvre le dépôt et le réimporte si le fichier JSON (ou son journal) a changé"""
+        repository = cls(db_path)
+        signature = repository.source_signature(json_path)
+        if repository.get_info('source_signature') != signature:
+            print(f"Import de {json_path} dans {db_path}...")
+            repository.import_json(json_path)
+            repository.prune_features()
+            repository.set_info('source_signature', signature)
+            print(f"✓ {repository.count()} clauses indexées")
+        return repository
+
+    @staticmethod
+    def source_signature(json_path):
+        """Signature (taille, date de modification) du snapshot et de son journal"""
+        parts = []
+        for path in (json_path, f"{json_path}.journal"):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+            else:
+                parts.append('-')
+        return '|'.join(parts)
+
+    def get_info(self, key):
+        row = self.conn.execute("SELECT value FROM repository_info WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_info(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO repository_info (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def import_data(self, data):
+        """Remplace le contenu du dépôt par des données au format JSON unifié"""
+        with self.conn:
+            self.conn.execute("DELETE FROM clauses")
+            self.conn.execute("DELETE FROM clause_keywords")
+            self.conn.execute("DELETE FROM clauses_fts")
+            for position, (clause_id, clause) in enumerate(data.get('clauses', {}).items()):
+                self._write(clause_id, clause, position)
+            # Conserver les autres clés de premier niveau (metadata, last_update, ...) dans leur ordre
+            document = {key: (None if key == 'clauses' else value) for key, value in data.items()}
+            document.setdefault('clauses', None)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO repository_info (key, value) VALUES ('document', ?)",
+                (json.dumps(document, ensure_ascii=False),)
+            )
+
+    def import_json(self, json_path='succession_data_unified.json'):
+        """Importe un fichier JSON unifié (journal de modifications compris)"""
+        self.import_data(ClauseStore(json_path).load())
+
+    def export_data(self):
+        """Reconstruit les données au format JSON unifié"""
+        document = json.loads(self.get_info('document') or '{"clauses": null}')
+        document['clauses'] = dict(self.iter_clauses())
+        return document
+
+    def export_json(self, json_path):
+        """Exporte le dépôt vers un fichier JSON unifié (écriture atomique)"""
+        ClauseStore(json_path).save(self.export_data())
+
+    def _write(self, clause_id, clause, position):
+        fields = clause_fields(clause)
+        digest = content_hash(clause)
+        if not self.conn.execute("SELECT 1 FROM clause_features WHERE content_hash = ?", (digest,)).fetchone():
+            self.conn.execute(
+                "INSERT INTO clause_features (content_hash, features) VALUES (?, ?)",
+                (digest, json.dumps(extract_features(clause, digest), ensure_ascii=False))
+            )
+        row = self.conn.execute("SELECT rowid FROM clauses WHERE id = ?", (clause_id,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM clauses_fts WHERE rowid = ?", (row[0],))
+            self.conn.execute("DELETE FROM clause_keywords WHERE clause_id = ?", (clause_id,))
+        self.conn.execute(
+            """INSERT OR REPLACE INTO clauses
+               (id, position, type, titre, description, needs_update, quality_score, last_modified,
+                data, content_hash)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (clause_id, position, fields['type'], fields['titre'], fields['description'],
+             fields['needs_update'], fields['quality_score'], fields['last_modified'],
+             json.dumps(clause, ensure_ascii=False), digest)
+        )
+        rowid = self.conn.execute("SELECT rowid FROM clauses WHERE id = ?", (clause_id,)).fetchone()[0]
+        self.conn.execute(
+            "INSERT INTO clauses_fts (rowid, titre, description) VALUES (?, ?, ?)",
+            (rowid, fields['titre'], fields['description'])
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO clause_keywords (keyword, clause_id) VALUES (?, ?)",
+            [(kw, clause_id) for kw in fields['mots_cles']]
+        )
+
+    def upsert(self, clause_id, clause):
+        """Ajoute ou met à jour une clause (conserve sa position si elle existe déjà)"""
+        with self.conn:
+            row = self.conn.execute("SELECT position FROM clauses WHERE id = ?", (clause_id,)).fetchone()
+            if row:
+                position = row[0]
+            else:
+                position = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM clauses").fetchone()[0]
+            self._write(clause_id, clause, position)
+
+    def delete(self, clause_id):
+        """Supprime une clause"""
+        with self.conn:
+            row = self.conn.execute("SELECT rowid FROM clauses WHERE id = ?", (clause_id,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM clauses_fts WHERE rowid = ?", (row[0],))
+            self.conn.execute("DELETE FROM clause_keywords WHERE clause_id = ?", (clause_id,))
+            self.conn.execute("DELETE FROM clauses WHERE id = ?", (clause_id,))
+
+    def get(self, clause_id):
+        """Retourne une clause ou None"""
+        row = self.conn.execute("SELECT data FROM clauses WHERE id = ?", (clause_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def features(self, clause_id):
+        """Caractéristiques calculées d'une clause, ou None"""
+        row = self.conn.execute(
+            """SELECT f.features FROM clauses c
+               JOIN clause_features f ON f.content_hash = c.content_hash
+               WHERE c.id = ?""",
+            (clause_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_features(self):
+        """Parcourt les caractéristiques de toutes les clauses (identifiant, caractéristiques)"""
+        rows = self.conn.execute(
+            """SELECT c.id, f.features FROM clauses c
+               JOIN clause_features f ON f.content_hash = c.content_hash
+               ORDER BY c.position"""
+        )
+        for clause_id, features in rows:
+            yield clause_id, json.loads(features)
+
+    def prune_features(self):
+        """Supprime les caractéristiques des contenus qui ne sont plus utilisés"""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM clause_features WHERE content_hash NOT IN (SELECT content_hash FROM clauses)"
+            )
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM clauses").fetchone()[0]
+
+    def _select(self, where='', params=()):
+        query = f"SELECT id, data FROM clauses {where} ORDER BY position"
+        for clause_id, data in self.conn.execute(query, params):
+            yield clause_id, json.loads(data)
+
+    def iter_clauses(self):
+        """Parcourt toutes les clauses dans leur ordre d'origine"""
+        return self._select()
+
+    def pending_enrichment(self):
+        """Clauses dont l'enrichissement doit être (re)fait"""
+        return self._select("WHERE needs_update = 1")
+
+    def by_type(self, clause_type):
+        return self._select("WHERE type = ?", (clause_type,))
+
+    def by_keyword(self, keyword):
+        """Clauses dont les mots-clés contiennent exactement ce terme (insensible à la casse)"""
+        return self._select(
+            "WHERE id IN (SELECT clause_id FROM clause_keywords WHERE keyword = ?)",
+            (keyword.strip().lower(),)
+        )
+
+    def modified_since(self, timestamp):
+        return self._select("WHERE last_modified >= ?", (timestamp,))
+
+    def by_min_quality(self, min_score):
+        return self._select("WHERE quality_score >= ?", (min_score,))
+
+    def search(self, text, limit=20):
+        """Recherche plein texte (FTS5) sur le titre et la description, triée par pertinence"""
+        query = fts_query(text)
+        if not query:
+            return []
+        rows = self.conn.execute(
+            """SELECT c.id, c.data FROM clauses_fts
+               JOIN clauses c ON c.rowid = clauses_fts.rowid
+               WHERE clauses_fts MATCH ?
+               ORDER BY bm25(clauses_fts) LIMIT ?""",
+            (query, limit)
+        ).fetchall()
+        return [(clause_id, json.loads(data)) for clause_id, data in rows]
+
+    def find_by_term(self, term, limit=20):
+        """Clauses liées à un terme : mots-clés exacts puis recherche plein texte"""
+        results = dict(self.by_keyword(term))
+        for clause_id, clause in self.search(term, limit):
+            results.setdefault(clause_id, clause)
+        return list(results.items())[:limit]
+
+    def close(self):
+        self.conn.close()
+
+if __name__ == "__main__":
+    import sys
+
+    repository = ClauseRepository.from_json()
+    if len(sys.argv) > 2 and sys.argv[1] == 'export':
+        repository.export_json(sys.argv[2])
+        print(f"✓ Dépôt exporté dans {sys.argv[2]}")
+    else:
+        print(f"✓ {repository.count()} clauses dans {repository.db_path}")
+        print(f"✓ {sum(1 for _ in repository.pending_enrichment())} clauses à enrichir")
@@ -0,0 +1,133 @@
+import os
+import json
+from datetime import datetime
+
+class ClauseStore:
+    """Stockage des clauses : un fichier snapshot JSON et un journal append-only des modifications
+
+    Chaque modification est ajoutée au journal (une ligne JSON) au lieu de réécrire tout le
+    fichier. Le journal est rejoué au chargement et fusionné périodiquement dans le snapshot.
+    """
+    def __init__(self, path='succession_data_unified.json', compact_every=200):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compact_every = compact_every  # Nombre d'opérations avant compaction automatique
+        self.data = None
+        self.pending_ops = 0
+        self.journal = None
+
+    def load(self, default=None):
+        """Charge le snapshot puis rejoue le journal
+
+        Args:
+            default: Données initiales si le snapshot n'existe pas. Si None, lève FileNotFoundError.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            if default is None:
+                raise
+            self.data = default
+        self.data.setdefault('clauses', {})
+
+        self.pending_ops = self.replay_journal()
+        if self.pending_ops:
+            print(f"✓ {self.pending_ops} opérations rejouées depuis {self.journal_path}")
+        return self.data
+
+    def replay_journal(self):
+        """Applique les opérations du journal aux données chargées"""
+        count = 0
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        print(f"⚠️ Entrée de journal invalide ignorée dans {self.journal_path}")
+                        continue
+                    self.apply(entry)
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return count
+
+    def apply(self, entry):
+        """Applique une opération du journal"""
+        if entry['op'] == 'upsert':
+            self.data['clauses'][entry['id']] = entry['clause']
+        elif entry['op'] == 'delete':
+            self.data['clauses'].pop(entry['id'], None)
+        elif entry['op'] == 'metadata':
+            self.data['metadata'] = entry['metadata']
+        if 'ts' in entry and 'metadata' in self.data:
+            self.data['metadata']['last_update'] = entry['ts']
+
+    def append(self, entry):
+        """Ajoute une opération au journal et compacte si nécessaire"""
+        entry['ts'] = datetime.now().isoformat()
+        if self.journal is None:
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+            if self.journal_ends_with_partial_line():
+                self.journal.write('\n')
+        self.journal.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.journal.flush()
+
+        self.pending_ops += 1
+        if self.compact_every and self.pending_ops >= self.compact_every:
+            self.compact()
+
+    def journal_ends_with_partial_line(self):
+        """Indique si le journal se termine par une ligne incomplète"""
+        with open(self.journal_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+
+    def upsert(self, clause_id, clause):
+        """Enregistre l'ajout ou la mise à jour d'une clause"""
+        self.data['clauses'][clause_id] = clause
+        self.append({'op': 'upsert', 'id': clause_id, 'clause': clause})
+
+    def delete(self, clause_id):
+        """Enregistre la suppression d'une clause"""
+        self.data['clauses'].pop(clause_id, None)
+        self.append({'op': 'delete', 'id': clause_id})
+
+    def set_metadata(self, metadata):
+        """Enregistre les métadonnées globales"""
+        self.data['metadata'] = metadata
+        self.append({'op': 'metadata', 'metadata': metadata})
+
+    def compact(self):
+        """Réécrit le snapshot de manière atomique puis vide le journal"""
+        self.write_snapshot(self.data)
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.pending_ops = 0
+
+    def save(self, data):
+        """Remplace entièrement les données stockées"""
+        self.data = data
+        self.compact()
+
+    def write_snapshot(self, data):
+        """Écrit le snapshot dans un fichier temporaire puis le renomme"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        """Compacte les opérations en attente"""
+        if self.pending_ops:
+            self.compact()
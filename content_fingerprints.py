@@ -0,0 +1,118 @@
+import json
+import copy
+import hashlib
+from collections import defaultdict
+from candidate_pairs import normalize_text, shingles
+
+SIMHASH_BITS = 64
+
+def content_text(content):
+    """Texte d'un contenu à analyser (texte brut ou document BOFiP)"""
+    if isinstance(content, dict):
+        return content.get('content', '')
+    return content
+
+def simhash(text, k=3):
+    """SimHash 64 bits des k-grammes de mots d'un texte"""
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles(text, k):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+class ContentFingerprintIndex:
+    """Index des contenus déjà analysés par Gemini et des clauses obtenues
+
+    Chaque contenu est identifié par le hash de son texte normalisé ; les quasi-doublons
+    sont retrouvés par leur SimHash (distance de Hamming <= max_distance, recherchée
+    par bandes de 8 bits). Les entrées sont ajoutées à un fichier JSON lines.
+    """
+    BANDS = 8
+
+    def __init__(self, path='content_fingerprints.jsonl', max_distance=5, max_content_chars=5000):
+        if max_distance >= self.BANDS:
+            raise ValueError("max_distance doit être inférieur au nombre de bandes")
+        self.path = path
+        self.max_distance = max_distance
+        self.max_content_chars = max_content_chars  # Troncature des contenus envoyés au modèle
+        self.entries = {}  # hash -> {'simhash', 'clauses'}
+        self.bands = [defaultdict(list) for _ in range(self.BANDS)]
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.saved_chars = 0
+        self.file = None
+        self.load()
+
+    @staticmethod
+    def fingerprint(content):
+        """Retourne (hash du texte normalisé, SimHash)"""
+        text = normalize_text(content_text(content))
+        return hashlib.sha256(text.encode('utf-8')).hexdigest(), simhash(text)
+
+    def band_keys(self, value):
+        width = SIMHASH_BITS // self.BANDS
+        return [(value >> (band * width)) & ((1 << width) - 1) for band in range(self.BANDS)]
+
+    def index(self, digest, value, clauses):
+        if digest not in self.entries:
+            for band, key in zip(self.bands, self.band_keys(value)):
+                band[key].append(digest)
+        self.entries[digest] = {'simhash': value, 'clauses': clauses}
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.index(entry['hash'], entry['simhash'], entry['clauses'])
+        except FileNotFoundError:
+            return
+        print(f"✓ Index des contenus analysés chargé : {len(self.entries)} empreintes")
+
+    def near_duplicate(self, value):
+        """Empreinte d'un contenu quasi identique déjà analysé, ou None"""
+        for band, key in zip(self.bands, self.band_keys(value)):
+            for digest in band.get(key, []):
+                if bin(self.entries[digest]['simhash'] ^ value).count('1') <= self.max_distance:
+                    return digest
+        return None
+
+    def lookup(self, content, fingerprint=None):
+        """Retourne une copie des clauses obtenues pour ce contenu (ou un quasi-doublon), sinon None"""
+        digest, value = fingerprint or self.fingerprint(content)
+        if digest in self.entries:
+            self.exact_hits += 1
+        else:
+            digest = self.near_duplicate(value)
+            if digest is None:
+                self.misses += 1
+                return None
+            self.near_hits += 1
+        self.saved_chars += min(len(content_text(content)), self.max_content_chars)
+        return copy.deepcopy(self.entries[digest]['clauses'])
+
+    def add(self, content, clauses, fingerprint=None):
+        """Enregistre les clauses obtenues pour un contenu (liste vide si l'analyse n'en a trouvé aucune)"""
+        digest, value = fingerprint or self.fingerprint(content)
+        self.index(digest, value, copy.deepcopy(clauses))
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(json.dumps({'hash': digest, 'simhash': value, 'clauses': clauses},
+                                   ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def print_report(self):
+        """Affiche les appels au modèle évités"""
+        print(f"✓ Contenus déjà analysés : {self.exact_hits} identiques, {self.near_hits} quasi identiques, "
+              f"{self.misses} nouveaux")
+        print(f"  - ≈ {self.saved_chars // 4} tokens de contenu non renvoyés au modèle")
@@ -0,0 +1,74 @@
+import heapq
+import itertools
+
+# Priorités du crawling (plus la valeur est faible, plus l'URL est traitée tôt)
+PRIORITY_NEXT_DOCUMENT = 0  # Lien "Document suivant"
+PRIORITY_SUCCESSION = 1  # Série BOI-ENR-DMTG (successions et donations)
+PRIORITY_DEFAULT = 2  # Autres pages BOFiP (BOI-ENR, pages PGP, ...)
+PRIORITY_UNRELATED = 3  # Autres séries BOI (BOI-TVA, BOI-BIC, ...)
+
+class CrawlFrontier:
+    """File de priorité dédupliquée des URLs en attente de crawling"""
+    def __init__(self, normalize=None):
+        self.normalize = normalize
+        self.heap = []  # Entrées (priorité, ordre d'insertion, url)
+        self.enqueued = {}  # url -> meilleure priorité en attente
+        self.counter = itertools.count()
+
+    @staticmethod
+    def classify(url):
+        """Détermine la priorité par défaut d'une URL"""
+        if 'BOI-ENR-DMTG' in url:
+            return PRIORITY_SUCCESSION
+        if 'BOI-' in url and 'BOI-ENR' not in url:
+            return PRIORITY_UNRELATED
+        return PRIORITY_DEFAULT
+
+    def push(self, url, priority=None):
+        """Ajoute une URL si elle n'est pas déjà en attente avec une meilleure priorité"""
+        if self.normalize:
+            url = self.normalize(url)
+        if priority is None:
+            priority = self.classify(url)
+        current = self.enqueued.get(url)
+        if current is not None and current <= priority:
+            return False
+        # L'ancienne entrée éventuelle reste dans le tas et sera ignorée au dépilement
+        self.enqueued[url] = priority
+        heapq.heappush(self.heap, (priority, next(self.counter), url))
+        return True
+
+    def pop(self):
+        """Retire l'URL de plus haute priorité, ou None si la file est vide"""
+        while self.heap:
+            priority, _, url = heapq.heappop(self.heap)
+            if self.enqueued.get(url) == priority:
+                del self.enqueued[url]
+                return url
+        return None
+
+    def __len__(self):
+        return len(self.enqueued)
+
+    def __bool__(self):
+        return bool(self.enqueued)
+
+    def __contains__(self, url):
+        return url in self.enqueued
+
+    def to_state(self):
+        """Sérialise la file sous forme de paires [priorité, url] dans l'ordre de traitement"""
+        entries = sorted(entry for entry in self.heap if self.enqueued.get(entry[2]) == entry[0])
+        return [[priority, url] for priority, _, url in entries]
+
+    @classmethod
+    def from_state(cls, entries, normalize=None):
+        """Reconstruit la file depuis l'état sauvegardé (accepte l'ancien format liste d'URLs)"""
+        frontier = cls(normalize=normalize)
+        for entry in entries:
+            if isinstance(entry, str):
+                frontier.push(entry)
+            else:
+                priority, url = entry
+                frontier.push(url, priority)
+        return frontier
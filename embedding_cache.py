@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import hashlib
+import heapq
+import numpy as np
+
+class EmbeddingCache:
+    """Cache disque des embeddings, indexé par le hash (modèle + texte préparé)
+
+    Les vecteurs sont stockés dans une matrice float32 mappée en mémoire (vectors.f32),
+    l'index clé -> ligne dans index.json. Au-delà de max_entries, les entrées les moins
+    récemment utilisées sont évincées et leurs lignes réutilisées.
+    """
+    GROWTH = 1024  # Nombre de lignes ajoutées à chaque agrandissement du fichier
+
+    def __init__(self, path='embedding_cache', dimension=1536, max_entries=50000):
+        self.path = path
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(path, 'vectors.f32')
+        self.index_path = os.path.join(path, 'index.json')
+        self.entries = {}  # clé -> {'row': int, 'last_used': float}
+        self.upserted = {}  # id du vecteur dans l'index -> clé du contenu indexé
+        self.free_rows = []
+        self.capacity = 0
+        self.matrix = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(path, exist_ok=True)
+        self.load()
+
+    @staticmethod
+    def make_key(model, text):
+        return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+
+    def load(self):
+        """Charge l'index et ouvre la matrice des vecteurs"""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('dimension') == self.dimension:
+                self.entries = index['entries']
+                self.upserted = index.get('upserted', {})
+                self.capacity = index['capacity']
+            else:
+                print("⚠️ Dimension du cache d'embeddings différente, cache réinitialisé")
+        if self.capacity and os.path.exists(self.vectors_path):
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                    shape=(self.capacity, self.dimension))
+        else:
+            self.entries = {}
+            self.upserted = {}
+            self.capacity = 0
+        used = {entry['row'] for entry in self.entries.values()}
+        self.free_rows = [row for row in range(self.capacity) if row not in used]
+
+    def grow(self):
+        """Agrandit le fichier des vecteurs"""
+        if self.matrix is not None:
+            self.matrix.flush()
+            del self.matrix
+        new_capacity = min(self.capacity + self.GROWTH, max(self.max_entries, self.capacity))
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self.dimension * 4)
+        self.free_rows.extend(range(self.capacity, new_capacity))
+        self.capacity = new_capacity
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                shape=(self.capacity, self.dimension))
+
+    def evict(self):
+        """Libère les lignes des entrées les moins récemment utilisées (10% du cache)"""
+        count = max(1, self.max_entries // 10)
+        for key in heapq.nsmallest(count, self.entries, key=lambda k: self.entries[k]['last_used']):
+            self.free_rows.append(self.entries.pop(key)['row'])
+            self.evictions += 1
+
+    def get(self, key):
+        """Retourne le vecteur associé à la clé, ou None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry['last_used'] = time.time()
+        return self.matrix[entry['row']].tolist()
+
+    def put(self, key, vector):
+        """Enregistre un vecteur"""
+        entry = self.entries.get(key)
+        if entry is None:
+            if not self.free_rows:
+                if self.capacity < self.max_entries:
+                    self.grow()
+                else:
+                    self.evict()
+            entry = {'row': self.free_rows.pop()}
+            self.entries[key] = entry
+        entry['last_used'] = entry['created'] = time.time()
+        self.matrix[entry['row']] = np.asarray(vector, dtype=np.float32)
+
+    def created_at(self, key):
+        """Date d'écriture du vecteur associé à la clé (None si absent)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry.get('created', entry['last_used'])
+
+    def remove(self, key):
+        """Supprime une entrée et libère sa ligne"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.free_rows.append(entry['row'])
+
+    def is_upserted(self, vector_id, key):
+        """Indique si ce contenu est déjà celui indexé sous cet identifiant"""
+        return self.upserted.get(vector_id) == key
+
+    def mark_upserted(self, vector_id, key):
+        self.upserted[vector_id] = key
+
+    def forget_upserted(self, prefix):
+        """Oublie les insertions enregistrées pour les identifiants commençant par prefix"""
+        self.upserted = {vector_id: key for vector_id, key in self.upserted.items()
+                         if not vector_id.startswith(prefix)}
+
+    def save(self):
+        """Écrit les vecteurs sur disque et l'index de manière atomique"""
+        if self.matrix is not None:
+            self.matrix.flush()
+        index = {
+            'dimension': self.dimension,
+            'capacity': self.capacity,
+            'entries': self.entries,
+            'upserted': self.upserted
+        }
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def print_report(self):
+        """Affiche les statistiques d'utilisation du cache"""
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        print(f"✓ Cache d'embeddings : {self.hits} hits, {self.misses} misses ({rate:.0f}% de hits)")
+        print(f"  - {len(self.entries)} vecteurs en cache, {self.evictions} évincés")
@@ -3,18 +3,32 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 from datetime import datetime
-import time
+import copy
+import asyncio
+from clause_store import ClauseStore
+from clause_repository import ClauseRepository
+from llm_pool import LLMClientPool
 
 class ClauseEnricher:
-    def __init__(self, input_file='succession_data.json'):
+    def __init__(self, input_file='succession_data.json', requests_per_minute=60, models=None, pool=None):
+        """
+        Args:
+            requests_per_minute: Débit maximal par clé API (concurrence réduite automatiquement en cas d'erreur 429)
+            models: Modèles à utiliser à la place des clés de .env (ex: modèle factice pour les tests)
+            pool: LLMClientPool existant à partager (ex: pool avec horloge simulée pour les tests)
+        """
         print("Initialisation de l'enrichisseur de clauses...")
         load_dotenv()
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("Clé API Gemini non trouvée dans le fichier .env")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        if pool is not None:
+            self.pool = pool
+        elif models is None:
+            self.pool = LLMClientPool.from_gemini_env(requests_per_minute=requests_per_minute)
+        else:
+            self.pool = LLMClientPool(models, requests_per_minute=requests_per_minute)
+        print(f"✓ {len(self.pool)} clés API Gemini chargées")
         self.input_file = input_file
+        self.output_file = input_file.replace('.json', '_enriched.json')
+        self.repository_path = input_file.replace('.json', '_enriched.db')
         self.load_data()
 
     def load_data(self):
@@ -32,17 +46,21 @@ class ClauseEnricher:
     def save_data(self, output_file=None):
         """Sauvegarde les données enrichies"""
         if output_file is None:
-            output_file = self.input_file.replace('.json', '_enriched.json')
+            output_file = self.output_file
         print(f"Sauvegarde des données dans {output_file}...")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
+        ClauseStore(output_file).save(self.data)
         print("✓ Données sauvegardées")
 
-    def enrich_clause(self, clause):
-        """Enrichit une clause avec des informations pratiques pour la rédaction"""
-        print(f"\nEnrichissement de la clause : {clause['titre']}")
+    @staticmethod
+    def format_reference(reference):
+        """Texte d'une référence : chaîne, ou document d'origine ajouté par le scraper"""
+        if isinstance(reference, dict):
+            return ' '.join(part for part in (reference.get('titre'), reference.get('url')) if part)
+        return str(reference)
 
-        prompt = f"""En tant qu'expert juridique spécialisé dans la rédaction d'actes de succession, analysez la clause suivante et fournissez des informations pratiques pour sa rédaction.
+    def enrichment_prompt(self, clause):
+        """Construit le prompt d'enrichissement d'une clause"""
+        return f"""En tant qu'expert juridique spécialisé dans la rédaction d'actes de succession, analysez la clause suivante et fournissez des informations pratiques pour sa rédaction.
 
 Clause actuelle :
 Type: {clause['type']}
@@ -50,7 +68,7 @@ Titre: {clause['titre']}
 Description: {clause['description']}
 Conditions actuelles: {', '.join(clause['conditions'])}
 Exceptions actuelles: {', '.join(clause['exceptions'])}
-Références: {', '.join(clause['references'])}
+Références: {', '.join(self.format_reference(reference) for reference in clause['references'])}
 
 Analysez cette clause et fournissez des informations pratiques au format JSON suivant :
 
@@ -91,41 +109,121 @@ Analysez cette clause et fournissez des informations pratiques au format JSON su
 
 IMPORTANT: Soyez précis et pratique. Les informations doivent être directement utilisables par un notaire."""
 
+    def generation_config(self):
+        return genai.types.GenerationConfig(
+            temperature=0.2,
+            top_p=0.8,
+            top_k=40,
+            candidate_count=1
+        )
+
+    def apply_enrichment(self, clause, response):
+        """Parse la réponse du modèle et met à jour la clause"""
+        # Nettoyer et parser la réponse
+        response_text = response.text.replace('```json', '').replace('```', '').strip()
+        enrichment = json.loads(response_text)
+
+        # Mettre à jour la clause avec les nouvelles informations
+        clause.update({
+            'conditions_application': enrichment['conditions_application'],
+            'exigences_redaction': enrichment['exigences_redaction'],
+            'cas_usage': enrichment['cas_usage'],
+            'points_attention': enrichment['points_attention'],
+            'formulations_recommandees': enrichment['formulations_recommandees'],
+            'pieges_eviter': enrichment['pieges_eviter'],
+            'documents_requis': enrichment['documents_requis'],
+            'delais_importants': enrichment['delais_importants'],
+            'date_enrichissement': datetime.now().isoformat()
+        })
+
+    def enrich_clause(self, clause):
+        """Enrichit une clause avec des informations pratiques pour la rédaction"""
+        print(f"\nEnrichissement de la clause : {clause['titre']}")
+        return asyncio.run(self.enrich_clause_async(clause))
+
+    async def enrich_clause_async(self, clause):
+        """Enrichit une clause via le pool de clés (concurrence adaptée aux erreurs 429)"""
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.2,
-                    top_p=0.8,
-                    top_k=40,
-                    candidate_count=1
-                )
+            response = await self.pool.generate(
+                self.enrichment_prompt(clause),
+                generation_config=self.generation_config()
             )
-
-            # Nettoyer et parser la réponse
-            response_text = response.text.replace('```json', '').replace('```', '').strip()
-            enrichment = json.loads(response_text)
-
-            # Mettre à jour la clause avec les nouvelles informations
-            clause.update({
-                'conditions_application': enrichment['conditions_application'],
-                'exigences_redaction': enrichment['exigences_redaction'],
-                'cas_usage': enrichment['cas_usage'],
-                'points_attention': enrichment['points_attention'],
-                'formulations_recommandees': enrichment['formulations_recommandees'],
-                'pieges_eviter': enrichment['pieges_eviter'],
-                'documents_requis': enrichment['documents_requis'],
-                'delais_importants': enrichment['delais_importants'],
-                'date_enrichissement': datetime.now().isoformat()
-            })
-
-            print("✓ Clause enrichie avec succès")
+            self.apply_enrichment(clause, response)
+            print(f"✓ Clause enrichie : {clause['titre']}")
             return True
 
         except Exception as e:
-            print(f"❌ Erreur lors de l'enrichissement : {str(e)}")
+            print(f"❌ Erreur lors de l'enrichissement de {clause['titre']} : {str(e)}")
             return False
 
+    def mark_enriched(self, clause):
+        """Met à jour les métadonnées d'enrichissement d'une clause au format unifié"""
+        if 'metadata' not in clause:
+            return
+        enrichment = clause['metadata'].setdefault('enrichment', {})
+        enrichment['version'] = enrichment.get('version', 0) + 1
+        enrichment['last_enriched'] = datetime.now().isoformat()
+        enrichment['needs_update'] = False
+        enrichment['update_reason'] = None
+
+    def open_output_store(self):
+        """Ouvre le fichier de sortie en y ajoutant les clauses d'entrée qui n'y sont pas encore"""
+        store = ClauseStore(self.output_file)
+        exists = os.path.exists(self.output_file)
+        data = store.load(default=copy.deepcopy(self.data))
+        missing = [key for key in self.data['clauses'] if key not in data['clauses']]
+        for key in missing:
+            data['clauses'][key] = copy.deepcopy(self.data['clauses'][key])
+        if missing or not exists:
+            # Le dépôt des clauses à enrichir est importé depuis le fichier de sortie
+            store.compact()
+        return store
+
+    async def enrich_all_clauses_async(self, concurrency=5):
+        """Enrichit en parallèle les clauses qui en ont besoin
+        
+        Chaque clause enrichie est écrite immédiatement dans le journal du fichier de sortie ;
+        les clauses déjà enrichies (needs_update à False) sont ignorées.
+        """
+        print("\n=== Début de l'enrichissement des clauses ===\n")
+        
+        store = self.open_output_store()
+        # Sélection par requête indexée (colonne needs_update) plutôt qu'en parcourant les clauses
+        repository = ClauseRepository.from_json(self.output_file, self.repository_path)
+        pending = list(repository.pending_enrichment())
+        print(f"✓ {len(pending)}/{repository.count()} clauses à enrichir")
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def enrich(key, clause):
+            async with semaphore:
+                # Les clauses au format unifié ont leur contenu sous la clé 'content'
+                success = await self.enrich_clause_async(clause.get('content', clause))
+                if success:
+                    self.mark_enriched(clause)
+                    store.upsert(key, clause)
+                    repository.upsert(key, clause)
+                return success
+        
+        success_count = 0
+        tasks = [enrich(key, clause) for key, clause in pending]
+        for i, task in enumerate(asyncio.as_completed(tasks), 1):
+            if await task:
+                success_count += 1
+            print(f"Progression : {i}/{len(tasks)}")
+        
+        # Fusionner le journal dans le fichier de sortie ; le dépôt, mis à jour au fil de
+        # l'eau, n'a pas à être réimporté
+        store.compact()
+        repository.set_info('source_signature', repository.source_signature(self.output_file))
+        repository.close()
+        self.data = store.data
+        
+        print(f"\n=== Enrichissement terminé ===")
+        print(f"✓ {success_count}/{len(pending)} clauses enrichies avec succès")
+        print(f"✓ Données sauvegardées dans '{self.output_file}'")
+        self.pool.print_report()
+
     def enrich_all_clauses(self):
         """Enrichit toutes les clauses du fichier"""
         print("\n=== Début de l'enrichissement des clauses ===\n")
@@ -142,21 +240,18 @@ IMPORTANT: Soyez précis et pratique. Les informations doivent être directement
             # Sauvegarder régulièrement
             if i % 5 == 0:
                 self.save_data()
-            
-            # Pause pour éviter de surcharger l'API
-            time.sleep(2)
 
         # Sauvegarde finale
         self.save_data()
         
         print(f"\n=== Enrichissement terminé ===")
         print(f"✓ {success_count}/{total_clauses} clauses enrichies avec succès")
-        print(f"✓ Données sauvegardées dans '{self.input_file.replace('.json', '_enriched.json')}'")
+        print(f"✓ Données sauvegardées dans '{self.output_file}'")
 
 if __name__ == "__main__":
     try:
         enricher = ClauseEnricher()
-        enricher.enrich_all_clauses()
+        asyncio.run(enricher.enrich_all_clauses_async())
     except Exception as e:
         print(f"\n❌ Erreur fatale : {str(e)}")
         exit(1)
@@ -1,10 +1,15 @@
 import json
 import os
+import time
+import asyncio
+import threading
 from typing import Dict, List, Any
 from dotenv import load_dotenv
-import google.generativeai as genai
 from datetime import datetime
 from vector_store import init_vector_store
+from bm25_index import reciprocal_rank_fusion
+from clause_repository import ClauseRepository
+from llm_pool import LLMClientPool
 from openai import OpenAI
 from pinecone import Pinecone
 
@@ -19,24 +24,32 @@ class Colors:
     UNDERLINE = '\033[4m'
 
 class SuccessionPlanGenerator:
-    def __init__(self):
-        """Initialise le générateur de plan de succession"""
+    def __init__(self, pool=None):
+        """Initialise le générateur de plan de succession
+        
+        Args:
+            pool: LLMClientPool existant à partager (par défaut un modèle par clé de .env)
+        """
         try:
             print(f"{Colors.HEADER}Chargement des variables d'environnement...{Colors.ENDC}")
             load_dotenv()
             
-            # Initialiser l'API OpenAI
+            # Initialiser l'API OpenAI (client partagé avec le vector store)
             self.openai_client = OpenAI(
                 api_key=os.getenv('OPENAI_API_KEY')
             )
             
-            # Initialiser l'API Gemini
-            api_key = os.getenv('GEMINI_API_KEY_1')
-            if not api_key:
-                raise ValueError("Clé API Gemini non trouvée dans .env")
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-            print(f"{Colors.GREEN}✓ API Gemini initialisée{Colors.ENDC}")
+            # Vector store initialisé à la première recherche puis réutilisé
+            # (verrou : les recherches s'exécutent dans des threads)
+            self._store = None
+            self._store_lock = threading.Lock()
+            
+            # Durée de chaque étape de la dernière génération de plan (secondes)
+            self.timings = {}
+            
+            # Initialiser l'API Gemini (pool de clés avec limites de débit)
+            self.pool = pool or LLMClientPool.from_gemini_env()
+            print(f"{Colors.GREEN}✓ API Gemini initialisée ({len(self.pool)} clés){Colors.ENDC}")
             
             # Charger la base de données des clauses
             self.load_clauses()
@@ -49,25 +62,10 @@ class SuccessionPlanGenerator:
         """Charge la base de données des clauses"""
         try:
             print(f"{Colors.HEADER}Chargement de la base de données des clauses...{Colors.ENDC}")
-            with open('succession_data_unified.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                clauses_data = data.get('clauses', {})
-                self.clauses = []
-                
-                # Parcourir toutes les sections et extraire les clauses
-                for section_key, section_data in clauses_data.items():
-                    if isinstance(section_data, dict):
-                        # Extraire les informations pertinentes
-                        clause = {
-                            'id': section_key,
-                            'titre': section_data.get('titre', ''),
-                            'description': section_data.get('description', ''),
-                            'type': section_data.get('type', ''),
-                            'conditions': section_data.get('conditions', [])
-                        }
-                        self.clauses.append(clause)
-                
-                print(f"{Colors.GREEN}✓ {len(self.clauses)} clauses chargées{Colors.ENDC}")
+            # Dépôt SQLite réimporté seulement si le fichier a changé ; les clauses sont
+            # lues à la demande, sans charger toute la base en mémoire
+            self.repository = ClauseRepository.from_json('succession_data_unified.json')
+            print(f"{Colors.GREEN}✓ {self.repository.count()} clauses disponibles{Colors.ENDC}")
         except FileNotFoundError:
             print(f"{Colors.RED}Erreur : Fichier succession_data_unified.json non trouvé{Colors.ENDC}")
             raise
@@ -78,6 +76,14 @@ class SuccessionPlanGenerator:
             print(f"{Colors.RED}Erreur lors du chargement des clauses : {str(e)}{Colors.ENDC}")
             raise
 
+    @property
+    def store(self):
+        """Vector store partagé par toutes les recherches du générateur"""
+        with self._store_lock:
+            if self._store is None:
+                self._store = init_vector_store(index_data=False, client=self.openai_client)
+        return self._store
+
     def get_embedding(self, text: str) -> List[float]:
         """Génère un embedding pour un texte donné"""
         try:
@@ -86,12 +92,11 @@ class SuccessionPlanGenerator:
             if not text:
                 raise ValueError("Le texte ne peut pas être vide")
                 
-            # Créer l'embedding
-            response = self.openai_client.embeddings.create(
-                input=[text],  # L'API attend une liste de textes
-                model="text-embedding-ada-002"
-            )
-            return response.data[0].embedding
+            # Créer l'embedding (cache des requêtes du vector store)
+            embedding, origin = self.store.embed_query(text)
+            if origin != 'api':
+                print(f"{Colors.GREEN}✓ Embedding repris du cache ({origin}){Colors.ENDC}")
+            return embedding
         except Exception as e:
             print(f"{Colors.RED}Erreur lors de la génération de l'embedding : {str(e)}{Colors.ENDC}")
             raise
@@ -101,14 +106,11 @@ class SuccessionPlanGenerator:
         try:
             print(f"{Colors.HEADER}Recherche des clauses pertinentes...{Colors.ENDC}")
             
-            # Initialiser Pinecone et obtenir l'index
-            store = init_vector_store(index_data=False)
-            
             # Générer l'embedding pour la situation
             query_embedding = self.get_embedding(situation)
             
-            # Rechercher dans Pinecone
-            results = store.index.query(
+            # Rechercher dans l'index
+            results = self.store.index.query(
                 vector=query_embedding,
                 top_k=10,
                 include_metadata=True
@@ -131,6 +133,39 @@ class SuccessionPlanGenerator:
             print(f"{Colors.RED}Erreur lors de la recherche de clauses : {str(e)}{Colors.ENDC}")
             raise
 
+    async def find_relevant_clauses_async(self, situation) -> List[Dict[str, Any]]:
+        """Recherche des clauses dans un thread (embedding et Pinecone sont bloquants)"""
+        return await asyncio.to_thread(self.find_relevant_clauses, situation)
+
+    def merge_results(self, *rankings, top_k=10) -> List[Dict[str, Any]]:
+        """Fusionne plusieurs recherches et les reclasse par rang (RRF)
+        
+        Une clause trouvée par plusieurs recherches est remontée ; son score de
+        pertinence est le meilleur score vectoriel obtenu.
+        """
+        clauses = {}
+        for results in rankings:
+            for clause in results:
+                best = clauses.get(clause['id'])
+                if best is None or clause['combined_score'] > best['combined_score']:
+                    clauses[clause['id']] = clause
+        fused = reciprocal_rank_fusion([[clause['id'] for clause in results] for results in rankings])
+        return [clauses[clause_id] for clause_id, _ in fused[:top_k]]
+
+    async def timed(self, stage, awaitable):
+        """Attend awaitable en enregistrant sa durée dans self.timings"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.timings[stage] = time.perf_counter() - start
+
+    def print_timings(self, total):
+        """Affiche la durée de chaque étape de la génération du plan"""
+        print(f"{Colors.BLUE}✓ Temps par étape (total {1000 * total:.0f} ms) :{Colors.ENDC}")
+        for stage, seconds in self.timings.items():
+            print(f"  - {stage} : {1000 * seconds:.0f} ms")
+
     async def analyze_situation(self, situation):
         """Analyse la situation et identifie les clauses pertinentes"""
         try:
@@ -183,7 +218,7 @@ class SuccessionPlanGenerator:
             """
             
             print(f"{Colors.HEADER}Envoi de la requête à Gemini...{Colors.ENDC}")
-            response = await self.model.generate_content_async(prompt)
+            response = await self.pool.generate(prompt)
             if not response or not response.text:
                 raise ValueError("Réponse vide de Gemini")
                 
@@ -217,32 +252,76 @@ class SuccessionPlanGenerator:
             raise
 
     async def process_situation(self, situation_text):
-        """Traite une situation donnée et génère un plan de succession"""
+        """Traite une situation donnée et génère un plan de succession
+        
+        Une première recherche sur le texte brut de la situation s'exécute pendant
+        l'analyse Gemini ; une seconde recherche sur l'analyse la complète ensuite, et
+        les deux classements sont fusionnés.
+        """
+        self.timings = {}
+        start = time.perf_counter()
+        initial_search = asyncio.create_task(
+            self.timed('recherche initiale', self.find_relevant_clauses_async(situation_text))
+        )
         try:
-            print(f"\nAnalyse de la situation...")
+            print(f"\nAnalyse de la situation (recherche initiale en parallèle)...")
             
             # Analyser la situation avec Gemini
-            analysis = await self.analyze_situation(situation_text)
+            analysis = await self.timed('analyse', self.analyze_situation(situation_text))
             
             print(f"\nRecherche des clauses pertinentes...")
-            # Utiliser l'analyse comme base pour la recherche de clauses
-            relevant_clauses = self.find_relevant_clauses(analysis["analyse"])
+            # Utiliser l'analyse comme base d'une recherche plus précise
+            refined_clauses = await self.timed(
+                'recherche affinée', self.find_relevant_clauses_async(analysis["analyse"])
+            )
+            try:
+                initial_clauses = await initial_search
+            except Exception:
+                # La recherche initiale n'est qu'un complément de la recherche affinée
+                initial_clauses = []
+            relevant_clauses = self.merge_results(refined_clauses, initial_clauses)
             
             print(f"\nGénération du plan...")
-            plan = await self.generate_plan_markdown(situation_text, analysis, relevant_clauses)
+            plan = await self.timed(
+                'génération', self.generate_plan_markdown(situation_text, analysis, relevant_clauses)
+            )
             
-            # Sauvegarder le plan
-            filename = f"plan_succession_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+            # Sauvegarder le plan (suffixe si plusieurs plans sont générés dans la même seconde)
+            base = f"plan_succession_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            filename = f"{base}.md"
+            suffix = 2
+            while os.path.exists(filename):
+                filename = f"{base}_{suffix}.md"
+                suffix += 1
             with open(filename, 'w', encoding='utf-8') as f:
                 f.write(plan)
             
             print(f"\n✓ Plan généré et sauvegardé dans {filename}")
+            self.print_timings(time.perf_counter() - start)
             return filename
             
         except Exception as e:
+            initial_search.cancel()
             print(f"{Colors.RED}Erreur lors de la génération du plan : {str(e)}{Colors.ENDC}")
             raise
 
+    async def process_situations(self, situations):
+        """Génère un plan pour chaque situation en réutilisant les mêmes clients et le même index
+        
+        Returns:
+            Liste des fichiers générés (None pour les situations en erreur)
+        """
+        filenames = []
+        for i, situation in enumerate(situations, 1):
+            print(f"\n{Colors.HEADER}=== Situation {i}/{len(situations)} ==={Colors.ENDC}")
+            try:
+                filenames.append(await self.process_situation(situation))
+            except Exception:
+                filenames.append(None)
+        
+        print(f"\n✓ {sum(1 for f in filenames if f)}/{len(situations)} plans générés")
+        return filenames
+
     async def generate_plan_markdown(self, situation, analysis, relevant_clauses):
         """Génère un plan détaillé au format Markdown"""
         now = datetime.now().strftime("%d/%m/%Y %H:%M")
@@ -285,7 +364,6 @@ Il posséde aussi un contrat d'assurance vie à 100 000 euros."""
         print(f"{Colors.RED}Erreur : {str(e)}{Colors.ENDC}")
         
 if __name__ == "__main__":
-    import asyncio
     import sys
     
     # Forcer le buffer de sortie à être ligne par ligne
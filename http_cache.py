@@ -0,0 +1,99 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+
+class HttpCache:
+    """Cache disque des réponses HTTP, indexé par URL
+
+    Chaque entrée (corps, ETag, Last-Modified, dates de récupération) est stockée
+    compressée dans un fichier {hash de l'URL}.json.gz. Une entrée plus vieille que
+    la durée de vie de sa source est revalidée par une requête conditionnelle
+    (If-None-Match / If-Modified-Since). En mode hors ligne, les pages sont servies
+    uniquement depuis le cache, sans aucun accès réseau.
+    """
+    def __init__(self, path='http_cache', offline=False):
+        self.path = path
+        self.offline = offline
+        self.hits = 0  # Servies depuis le cache sans requête
+        self.revalidated = 0  # Réponses 304
+        self.misses = 0  # Téléchargées
+        os.makedirs(path, exist_ok=True)
+
+    def entry_path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, f"{digest}.json.gz")
+
+    def get(self, url):
+        """Retourne l'entrée en cache pour cette URL, ou None"""
+        try:
+            with gzip.open(self.entry_path(url), 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, EOFError, OSError, json.JSONDecodeError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def write(self, entry):
+        """Écrit une entrée de manière atomique"""
+        path = self.entry_path(entry['url'])
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def is_fresh(entry, ttl):
+        """Indique si l'entrée peut être servie sans revalidation"""
+        return ttl is not None and time.time() - entry['validated_at'] < ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        """En-têtes de revalidation d'une entrée"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, source, body, headers, previous=None):
+        """Enregistre une réponse 200 et retourne l'entrée
+
+        L'entrée reste marquée comme traitée si le corps n'a pas changé.
+        """
+        body_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()
+        now = time.time()
+        entry = {
+            'url': url,
+            'source': source,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': now,
+            'validated_at': now,
+            'body_hash': body_hash,
+            'processed': bool(previous and previous.get('processed')
+                              and previous.get('body_hash') == body_hash),
+            'body': body
+        }
+        self.write(entry)
+        return entry
+
+    def touch(self, entry):
+        """Prolonge la validité d'une entrée après une réponse 304"""
+        entry['validated_at'] = time.time()
+        self.write(entry)
+
+    def mark_processed(self, url):
+        """Indique que le contenu actuel de la page a été parsé et analysé"""
+        if self.offline:
+            return
+        entry = self.get(url)
+        if entry and not entry.get('processed'):
+            entry['processed'] = True
+            self.write(entry)
+
+    def print_report(self):
+        """Affiche les statistiques d'utilisation du cache"""
+        print(f"✓ Cache HTTP : {self.hits} pages servies depuis le cache, "
+              f"{self.revalidated} revalidées (304), {self.misses} téléchargées")
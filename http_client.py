@@ -0,0 +1,152 @@
+import random
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+from types import SimpleNamespace
+from urllib.parse import urlparse
+import aiohttp
+
+try:
+    import brotli  # noqa: F401  (décodage "br" par aiohttp)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+RETRY_STATUSES = {500, 502, 503, 504}
+
+@dataclass
+class FetchResult:
+    """Résultat de la récupération d'une page, transmis tel quel aux étapes suivantes"""
+    url: str
+    source: str
+    status: Optional[int] = None
+    body: Optional[str] = None
+    elapsed: float = 0.0  # Durée de la récupération (secondes)
+    origin: str = 'network'  # 'network', 'cache', 'revalidated' ou 'offline'
+    unchanged: bool = False  # Inchangée depuis son dernier traitement complet
+    query: Optional[str] = None  # Requête de recherche à l'origine de la page
+
+    @property
+    def ok(self):
+        return self.body is not None
+
+class HttpClient:
+    """Client HTTP partagé par tous les chemins de récupération du scraper
+
+    Une seule session aiohttp (pool de connexions keep-alive, cache DNS, délais et
+    compression configurés) est ouverte tant qu'au moins un appelant l'utilise. Le
+    nombre de connexions simultanées est limité par hôte, les erreurs 5xx et les
+    délais dépassés sont retentés avec un délai exponentiel.
+    """
+    def __init__(self, limit=20, limit_per_host=4, host_limits=None, total_timeout=60,
+                 connect_timeout=10, read_timeout=30, max_retries=3, base_delay=1.0,
+                 user_agent='Mozilla/5.0 (compatible; LegalNotario/1.0)'):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.host_limits = host_limits or {}  # hôte -> connexions simultanées
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout,
+                                             sock_read=read_timeout)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.headers = {'User-Agent': user_agent, 'Accept-Encoding': ACCEPT_ENCODING}
+        self.session = None
+        self.users = 0
+        self.host_semaphores = {}
+        self.stats = {
+            'requests': 0,
+            'new_connections': 0,
+            'reused_connections': 0,
+            'retries': 0,
+            'errors': 0,
+            'active': 0,
+            'peak_active': 0
+        }
+
+    def trace_config(self):
+        """Compte les connexions créées et réutilisées par le pool"""
+        trace = aiohttp.TraceConfig()
+
+        async def on_create(session, context, params):
+            self.stats['new_connections'] += 1
+
+        async def on_reuse(session, context, params):
+            self.stats['reused_connections'] += 1
+
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    async def __aenter__(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=0,  # Limites par hôte gérées par host_semaphore
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=self.headers,
+                trace_configs=[self.trace_config()]
+            )
+        self.users += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.users -= 1
+        if self.users == 0:
+            await self.session.close()
+            self.session = None
+
+    def host_semaphore(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_semaphores:
+            limit = self.host_limits.get(host, self.limit_per_host)
+            self.host_semaphores[host] = asyncio.Semaphore(limit)
+        return self.host_semaphores[host]
+
+    async def get(self, url, headers=None):
+        """Effectue une requête GET et retourne la réponse lue (status, headers, text)
+
+        Les réponses 5xx et les erreurs réseau sont retentées ; la dernière erreur
+        est levée si toutes les tentatives échouent.
+        """
+        if self.session is None:
+            raise RuntimeError("HttpClient doit être utilisé dans un bloc async with")
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.host_semaphore(url):
+                    self.stats['requests'] += 1
+                    self.stats['active'] += 1
+                    self.stats['peak_active'] = max(self.stats['peak_active'], self.stats['active'])
+                    try:
+                        async with self.session.get(url, headers=headers) as response:
+                            text = await response.text()
+                            result = SimpleNamespace(status=response.status,
+                                                     headers=response.headers, text=text)
+                    finally:
+                        self.stats['active'] -= 1
+                if result.status not in RETRY_STATUSES or attempt == self.max_retries:
+                    return result
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    self.stats['errors'] += 1
+                    raise
+                print(f"Erreur réseau pour {url} ({type(e).__name__}), nouvelle tentative...")
+            self.stats['retries'] += 1
+            delay = self.base_delay * (2 ** attempt) * (1 + random.random())
+            await asyncio.sleep(delay)
+
+    def reuse_ratio(self):
+        total = self.stats['new_connections'] + self.stats['reused_connections']
+        return self.stats['reused_connections'] / total if total else 0.0
+
+    def print_report(self):
+        """Affiche les statistiques du pool de connexions"""
+        s = self.stats
+        print(f"✓ Client HTTP : {s['requests']} requêtes, {s['retries']} nouvelles tentatives, "
+              f"{s['errors']} échecs")
+        print(f"  - Connexions : {s['new_connections']} ouvertes, {s['reused_connections']} réutilisées "
+              f"({100 * self.reuse_ratio():.0f}% de réutilisation)")
+        print(f"  - Connexions actives : {s['active']} (maximum {s['peak_active']})")
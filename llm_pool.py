@@ -0,0 +1,299 @@
+import os
+import time
+import asyncio
+import google.generativeai as genai
+import google.ai.generativelanguage as glm
+from rate_limit import is_rate_limit_error, is_expired_key_error
+
+def load_gemini_api_keys(max_keys=5):
+    """Charge les clés GEMINI_API_KEY_1..N depuis l'environnement (ou GEMINI_API_KEY à défaut)"""
+    api_keys = []
+    for i in range(1, max_keys + 1):
+        key = os.getenv(f'GEMINI_API_KEY_{i}')
+        if key:
+            api_keys.append(key)
+        elif i == 1:  # Si pas de clé numérotée, essayer la clé par défaut
+            key = os.getenv('GEMINI_API_KEY')
+            if key:
+                api_keys.append(key)
+    return api_keys
+
+def estimate_tokens(text):
+    """Estimation grossière du nombre de tokens d'un texte (≈ 4 caractères par token)"""
+    return len(str(text)) // 4 + 1
+
+class SystemClock:
+    """Horloge réelle"""
+    def now(self):
+        return time.monotonic()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+class FakeClock:
+    """Horloge simulée pour les tests : sleep avance le temps sans attendre"""
+    def __init__(self, start=0.0):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    async def sleep(self, seconds):
+        self.current += max(0.0, seconds)
+        await asyncio.sleep(0)
+
+class Budget:
+    """Seau à jetons piloté par une horloge injectable (requêtes ou tokens par minute)"""
+    def __init__(self, per_minute, capacity, clock):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock.now()
+
+    def refill(self):
+        now = self.clock.now()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Délai (secondes) avant que amount jetons soient disponibles"""
+        self.refill()
+        missing = min(amount, self.capacity) - self.tokens
+        # Reliquat dû aux arrondis : une attente plus courte que la précision de
+        # l'horloge ne ferait pas avancer une horloge simulée
+        if missing <= 1e-9:
+            return 0.0
+        return missing / self.rate
+
+    def consume(self, amount):
+        self.refill()
+        self.tokens -= min(amount, self.capacity)
+
+class GeminiKeyModel:
+    """Modèle Gemini dont les clients sont liés à une clé API précise
+
+    genai.configure règle une configuration globale, lue par GenerativeModel au
+    premier appel : plusieurs modèles créés à la suite utiliseraient tous la dernière
+    clé configurée. Chaque modèle reçoit donc ses propres clients, créés avec sa clé
+    (le client asynchrone est recréé pour chaque boucle asyncio).
+    """
+    def __init__(self, api_key, model_name='gemini-pro'):
+        self.api_key = api_key
+        self.model = genai.GenerativeModel(model_name)
+        self._loop = None
+
+    def client_options(self):
+        return {'api_key': self.api_key}
+
+    def generate_content(self, *args, **kwargs):
+        if self.model._client is None:
+            self.model._client = glm.GenerativeServiceClient(client_options=self.client_options())
+        return self.model.generate_content(*args, **kwargs)
+
+    async def generate_content_async(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.model._async_client = glm.GenerativeServiceAsyncClient(client_options=self.client_options())
+        return await self.model.generate_content_async(*args, **kwargs)
+
+class KeySlot:
+    """État d'une clé API : budgets, concurrence AIMD, quarantaine et statistiques"""
+    def __init__(self, name, client, clock, requests_per_minute, tokens_per_minute, burst,
+                 initial_concurrency, max_concurrency):
+        self.name = name
+        self.client = client
+        self.requests = Budget(requests_per_minute, burst, clock)
+        self.tokens = Budget(tokens_per_minute, tokens_per_minute, clock) if tokens_per_minute else None
+        self.limit = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.quarantined_until = 0.0
+        self.consecutive_429 = 0
+        self.dead = False
+        self.stats = {'requests': 0, 'successes': 0, 'rate_limited': 0, 'errors': 0}
+
+    def wait_time(self, now, tokens):
+        """Délai avant que la clé puisse accepter la requête (None : attendre une libération)"""
+        if now < self.quarantined_until:
+            return self.quarantined_until - now
+        if self.in_flight >= max(1, int(self.limit)):
+            return None
+        wait = self.requests.wait_time(1)
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+class LLMClientPool:
+    """Pool de clients LLM (un par clé API) partagé par tous les appelants
+
+    - Budgets de requêtes et de tokens par minute pour chaque clé.
+    - Concurrence AIMD par clé : +1/limite par succès, divisée par deux sur 429.
+    - Une clé en 429 est mise en quarantaine (durée doublée à chaque 429 consécutif),
+      une clé expirée ou invalide est retirée définitivement.
+    - acquire est équitable : les appelants sont servis dans leur ordre d'arrivée.
+
+    L'horloge est injectable (FakeClock) et les clients sont de simples objets exposant
+    generate_content_async, ce qui permet de tester le pool avec un modèle factice.
+    """
+    def __init__(self, clients, requests_per_minute=60, tokens_per_minute=None, burst=1,
+                 initial_concurrency=1, max_concurrency=4, quarantine=10.0, max_quarantine=300.0,
+                 max_attempts=5, clock=None, names=None):
+        if not clients:
+            raise ValueError("Aucun client LLM disponible")
+        self.clock = clock or SystemClock()
+        names = names or [f"clé {i}" for i in range(1, len(clients) + 1)]
+        self.slots = [
+            KeySlot(name, client, self.clock, requests_per_minute, tokens_per_minute, burst,
+                    initial_concurrency, max_concurrency)
+            for name, client in zip(names, clients)
+        ]
+        self.quarantine = quarantine
+        self.max_quarantine = max_quarantine
+        self.max_attempts = max_attempts
+        self.current = 0
+        self.waiting = 0
+        self._loop = None
+        self._queue_lock = None
+        self._changed = None
+
+    @classmethod
+    def from_gemini_env(cls, model_name='gemini-pro', **kwargs):
+        """Crée un modèle Gemini lié à sa clé pour chaque clé trouvée dans .env"""
+        api_keys = load_gemini_api_keys()
+        if not api_keys:
+            raise ValueError("Aucune clé API Gemini trouvée dans .env")
+        return cls([GeminiKeyModel(key, model_name) for key in api_keys], **kwargs)
+
+    def __len__(self):
+        """Nombre de clés encore utilisables"""
+        return sum(1 for slot in self.slots if not slot.dead)
+
+    @property
+    def queue_lock(self):
+        # Recréés pour chaque boucle asyncio (appels synchrones via asyncio.run)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue_lock = asyncio.Lock()
+            self._changed = asyncio.Event()
+        return self._queue_lock
+
+    def pick_slot(self, tokens):
+        """Retourne (clé utilisable ou None, délai avant la prochaine disponibilité)"""
+        now = self.clock.now()
+        live = [slot for slot in self.slots if not slot.dead]
+        if not live:
+            raise ValueError("Toutes les clés API sont expirées ou invalides")
+        next_wait = None
+        # Rotation à partir de la dernière clé servie pour répartir la charge
+        for offset in range(len(self.slots)):
+            slot = self.slots[(self.current + offset) % len(self.slots)]
+            if slot.dead:
+                continue
+            wait = slot.wait_time(now, tokens)
+            if wait == 0:
+                self.current = (self.slots.index(slot) + 1) % len(self.slots)
+                return slot, 0
+            if wait is not None:
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+        return None, next_wait
+
+    async def wait_for_change(self, delay):
+        """Attend une libération de clé ou l'écoulement du délai"""
+        waiters = [asyncio.ensure_future(self._changed.wait())]
+        if delay is not None:
+            waiters.append(asyncio.ensure_future(self.clock.sleep(delay)))
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def acquire(self, tokens=1):
+        """Réserve une clé pour une requête d'environ tokens tokens
+
+        Les appelants attendent dans une file FIFO ; seul le premier de la file
+        cherche une clé disponible.
+        """
+        self.waiting += 1
+        try:
+            async with self.queue_lock:
+                while True:
+                    self._changed.clear()
+                    slot, wait = self.pick_slot(tokens)
+                    if slot is not None:
+                        slot.requests.consume(1)
+                        if slot.tokens is not None:
+                            slot.tokens.consume(tokens)
+                        slot.in_flight += 1
+                        slot.stats['requests'] += 1
+                        return slot
+                    await self.wait_for_change(wait)
+        finally:
+            self.waiting -= 1
+
+    def release(self, slot, error=None):
+        """Libère une clé et adapte son état selon le résultat de la requête"""
+        slot.in_flight -= 1
+        if error is None:
+            slot.stats['successes'] += 1
+            slot.consecutive_429 = 0
+            slot.limit = min(slot.max_concurrency, slot.limit + 1 / slot.limit)
+        elif is_expired_key_error(error):
+            slot.dead = True
+            slot.stats['errors'] += 1
+            print(f"Clé API expirée ou invalide ({slot.name}), clé retirée du pool")
+        elif is_rate_limit_error(error):
+            slot.stats['rate_limited'] += 1
+            slot.consecutive_429 += 1
+            slot.limit = max(1.0, slot.limit / 2)
+            duration = min(self.max_quarantine, self.quarantine * 2 ** (slot.consecutive_429 - 1))
+            slot.quarantined_until = self.clock.now() + duration
+            print(f"Limite de quota atteinte ({slot.name}), clé en quarantaine pendant {duration:.0f} secondes")
+        else:
+            slot.stats['errors'] += 1
+        if self._changed is not None:
+            self._changed.set()
+
+    async def call(self, request, tokens=1):
+        """Exécute request(client) avec une clé du pool
+
+        Les erreurs 429 et de clé expirée sont retentées sur une autre clé ; les autres
+        erreurs sont levées telles quelles.
+        """
+        last_error = None
+        for _ in range(self.max_attempts):
+            slot = await self.acquire(tokens)
+            try:
+                result = await request(slot.client)
+            except Exception as e:
+                self.release(slot, e)
+                if not (is_rate_limit_error(e) or is_expired_key_error(e)):
+                    raise
+                last_error = e
+                continue
+            self.release(slot)
+            return result
+        raise last_error
+
+    async def generate(self, prompt, **kwargs):
+        """Appelle generate_content_async du modèle d'une clé disponible"""
+        return await self.call(lambda model: model.generate_content_async(prompt, **kwargs),
+                               tokens=estimate_tokens(prompt))
+
+    def print_report(self):
+        """Affiche l'état et les statistiques de chaque clé"""
+        now = self.clock.now()
+        print(f"✓ Pool LLM : {len(self)}/{len(self.slots)} clés utilisables")
+        for slot in self.slots:
+            if slot.dead:
+                state = "retirée"
+            elif now < slot.quarantined_until:
+                state = f"en quarantaine ({slot.quarantined_until - now:.0f} s)"
+            else:
+                state = f"concurrence {slot.limit:.1f}"
+            s = slot.stats
+            print(f"  - {slot.name} : {s['successes']}/{s['requests']} requêtes réussies, "
+                  f"{s['rate_limited']} erreurs 429, {s['errors']} autres erreurs, {state}")
@@ -0,0 +1,125 @@
+import os
+import json
+from types import SimpleNamespace
+import numpy as np
+
+class LocalVectorIndex:
+    """Index vectoriel local (NumPy) exposant la même interface que l'index Pinecone
+
+    Les vecteurs sont normalisés à l'insertion : la similarité cosinus devient un simple
+    produit matriciel, et les top-k sont sélectionnés avec argpartition. L'index est
+    persisté dans vectors.npy (chargé en mmap) et entries.json.
+    """
+    def __init__(self, path='local_index', dimension=1536, autosave=True):
+        self.path = path
+        self.dimension = dimension
+        self.autosave = autosave
+        self.vectors_path = os.path.join(path, 'vectors.npy')
+        self.entries_path = os.path.join(path, 'entries.json')
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.ids = []
+        self.metadata = []
+        self.rows = {}  # id -> ligne de la matrice
+        os.makedirs(path, exist_ok=True)
+        self.load()
+
+    def load(self):
+        """Charge l'index depuis le disque (matrice mappée en mémoire)"""
+        if not (os.path.exists(self.vectors_path) and os.path.exists(self.entries_path)):
+            return
+        with open(self.entries_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        self.matrix = np.load(self.vectors_path, mmap_mode='r')
+        self.ids = entries['ids']
+        self.metadata = entries['metadata']
+        self.rows = {vector_id: row for row, vector_id in enumerate(self.ids)}
+        print(f"✓ Index local chargé : {len(self.ids)} vecteurs")
+
+    def save(self):
+        """Écrit l'index sur disque (fichiers temporaires puis renommage)"""
+        tmp_vectors = os.path.join(self.path, 'vectors.tmp.npy')
+        np.save(tmp_vectors, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        tmp_entries = f"{self.entries_path}.tmp"
+        with open(tmp_entries, 'w', encoding='utf-8') as f:
+            json.dump({'ids': self.ids, 'metadata': self.metadata}, f, ensure_ascii=False)
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_entries, self.entries_path)
+
+    @staticmethod
+    def normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def upsert(self, vectors, **kwargs):
+        """Insère ou remplace des vecteurs : tuples (id, valeurs, métadonnées) ou dicts Pinecone"""
+        if not vectors:
+            return {'upserted_count': 0}
+        ids, values, metadata = [], [], []
+        for vector in vectors:
+            if isinstance(vector, dict):
+                vector = (vector['id'], vector['values'], vector.get('metadata', {}))
+            ids.append(vector[0])
+            values.append(vector[1])
+            metadata.append(vector[2] if len(vector) > 2 else {})
+        values = self.normalize(np.asarray(values, dtype=np.float32))
+
+        # Copie modifiable de la matrice (elle peut être mappée en lecture seule)
+        matrix = np.array(self.matrix, dtype=np.float32)
+        new_rows = []
+        for vector_id, value, meta in zip(ids, values, metadata):
+            row = self.rows.get(vector_id)
+            if row is None:
+                self.rows[vector_id] = len(self.ids)
+                new_rows.append(value)
+                self.ids.append(vector_id)
+                self.metadata.append(meta)
+            else:
+                # L'identifiant peut apparaître plusieurs fois dans le même lot
+                if row < len(matrix):
+                    matrix[row] = value
+                else:
+                    new_rows[row - len(matrix)] = value
+                self.metadata[row] = meta
+        if new_rows:
+            matrix = np.vstack([matrix, np.asarray(new_rows, dtype=np.float32)])
+        self.matrix = matrix
+
+        if self.autosave:
+            self.save()
+        return {'upserted_count': len(ids)}
+
+    def delete(self, ids, **kwargs):
+        """Supprime des vecteurs par identifiant"""
+        ids = set(ids)
+        keep = [row for row, vector_id in enumerate(self.ids) if vector_id not in ids]
+        self.matrix = np.array(self.matrix[keep], dtype=np.float32)
+        self.ids = [self.ids[row] for row in keep]
+        self.metadata = [self.metadata[row] for row in keep]
+        self.rows = {vector_id: row for row, vector_id in enumerate(self.ids)}
+        if self.autosave:
+            self.save()
+
+    def query(self, vector, top_k=10, include_metadata=True, **kwargs):
+        """Retourne les top_k vecteurs les plus proches (similarité cosinus)"""
+        if not self.ids:
+            return SimpleNamespace(matches=[])
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = self.matrix @ query
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return SimpleNamespace(matches=[
+            SimpleNamespace(
+                id=self.ids[row],
+                score=float(scores[row]),
+                metadata=self.metadata[row] if include_metadata else None
+            )
+            for row in top
+        ])
+
+    def describe_index_stats(self):
+        return {'dimension': self.dimension, 'total_vector_count': len(self.ids)}
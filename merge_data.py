@@ -1,6 +1,7 @@
 import json
 from datetime import datetime
 import os
+from clause_store import ClauseStore
 
 class DataMerger:
     def __init__(self, raw_file='succession_data.json', enriched_file='succession_data_enriched.json'):
@@ -140,8 +141,8 @@ class DataMerger:
         output_file = 'succession_data_unified.json'
         print(f"\nSauvegarde des données fusionnées dans {output_file}...")
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=4)
+        # Écriture atomique, remplace aussi un éventuel journal de modifications
+        ClauseStore(output_file).save(merged_data)
 
         print("\n=== Fusion terminée ===")
         print(f"✓ Total des clauses : {merged_data['metadata']['stats']['total_clauses']}")
@@ -0,0 +1,198 @@
+import re
+import importlib.util
+from bs4 import BeautifulSoup
+from crawl_frontier import PRIORITY_NEXT_DOCUMENT
+
+# Les parsers sont des fonctions pures (HTML en entrée, textes et liens en sortie)
+# définies au niveau du module pour pouvoir être exécutées dans un ProcessPoolExecutor
+
+HTML_PARSER = 'html.parser'
+LXML_AVAILABLE = importlib.util.find_spec('lxml') is not None
+BOI_PATTERN = re.compile(r'BOI-[A-Z]+-[A-Z]+-\d+(?:-\d+)*(?:-\d+)*')
+BOFIP_BASE_URL = "https://bofip.impots.gouv.fr"
+SUCCESSION_TERMS = ('succession', 'héritier', 'testament')
+IGNORED_TITLES = ('services', 'informations', 'contact')
+
+def html_features(use_lxml=False):
+    """Parser BeautifulSoup à utiliser : lxml seulement s'il est demandé et installé
+
+    html.parser reste le défaut pour que le résultat du parsing ne dépende pas des
+    paquets installés.
+    """
+    return 'lxml' if use_lxml and LXML_AVAILABLE else HTML_PARSER
+
+def is_succession_text(text):
+    lower = text.lower()
+    return len(text) > 100 and any(term in lower for term in SUCCESSION_TERMS)
+
+def parse_legifrance(content, features=HTML_PARSER):
+    """Parse le contenu de Légifrance"""
+    soup = BeautifulSoup(content, features)
+    results = []
+    # Rechercher dans les articles et les sections pertinentes
+    for element in soup.find_all(['article', 'div'], class_=['article-item', 'code-article', 'article-content']):
+        text = element.get_text(strip=True)
+        if is_succession_text(text):
+            results.append(text)
+    return results
+
+def parse_service_public(content, features=HTML_PARSER):
+    """Parse le contenu de Service-Public.fr"""
+    soup = BeautifulSoup(content, features)
+    results = []
+    # Rechercher dans les résultats de recherche et les sections de contenu
+    for element in soup.find_all(['div', 'section'], class_=['search-result', 'content-text', 'article-content']):
+        text = element.get_text(strip=True)
+        if is_succession_text(text):
+            results.append(text)
+    return results
+
+def parse_bofip(content, features=HTML_PARSER):
+    """Parse le contenu du BOFiP"""
+    # On ne traite pas directement le contenu ici car c'est fait par extract_bofip_page
+    return []
+
+PARSERS = {
+    'legifrance': parse_legifrance,
+    'service_public': parse_service_public,
+    'bofip': parse_bofip
+}
+
+def parse_search_page(content, sources, features=HTML_PARSER):
+    """Applique les parsers des sources indiquées à une page de résultats"""
+    results = []
+    for source_name in sources:
+        try:
+            results.extend(PARSERS[source_name](content, features) or [])
+        except Exception as e:
+            print(f"Erreur lors du parsing de {source_name}: {str(e)}")
+    return results
+
+def normalize_bofip_url(url):
+    """Normalise une URL à crawler (ancre, URL relative)"""
+    if '%23' in url:
+        url = url.split('%23')[0]
+    if not url.startswith('http'):
+        url = f"{BOFIP_BASE_URL}{url if url.startswith('/') else f'/{url}'}"
+    return url
+
+def extract_boi_references(text):
+    """Extrait les références BOI d'un texte"""
+    return {f"{BOFIP_BASE_URL}/bofip/{boi_id}" for boi_id in BOI_PATTERN.findall(text)}
+
+BOFIP_HEADINGS = ('h1', 'h2', 'h3')
+BOFIP_BLOCKS = ('p', 'div')
+
+def walk_bofip_tree(soup):
+    """Parcourt l'arbre une seule fois, dans l'ordre du document
+
+    Returns:
+        (titres h1/h2/h3, liens <a href>, blocs p/div les plus externes)
+    """
+    headings = []
+    links = []
+    blocks = []
+    stack = [(soup, False)]
+    while stack:
+        node, in_block = stack.pop()
+        children = []
+        for child in node.contents:
+            name = child.name
+            if name is None:
+                continue
+            child_in_block = in_block
+            if name in BOFIP_HEADINGS:
+                headings.append(child)
+            elif name == 'a' and child.has_attr('href'):
+                links.append(child)
+            elif name in BOFIP_BLOCKS and not in_block:
+                # Le texte d'un bloc contient celui des blocs imbriqués
+                blocks.append(child)
+                child_in_block = True
+            children.append((child, child_in_block))
+        stack.extend(reversed(children))
+    return headings, links, blocks
+
+def extract_bofip_page(content, current_url, features=HTML_PARSER):
+    """Extrait le document et les liens d'une page BOFiP
+
+    L'arbre n'est parcouru qu'une fois (walk_bofip_tree) ; le texte de chaque bloc
+    p/div est calculé une seule fois et sert aux sections comme aux références BOI.
+    Les références sont cherchées dans le texte des blocs dont les éléments sont
+    séparés par un espace, pour ne pas coller un identifiant au texte qui le suit.
+
+    Returns:
+        (document ou None, dict URL -> priorité, None pour la priorité par défaut)
+    """
+    soup = BeautifulSoup(content, features)
+    headings, links, blocks = walk_bofip_tree(soup)
+    block_texts = {id(block): block.get_text(strip=True) for block in blocks}
+
+    # Extraire le titre
+    title = ""
+    title_elem = next((heading for heading in headings if heading.name == 'h1'), None)
+    if title_elem:
+        title = title_elem.get_text(strip=True)
+        if not any(x in title.lower() for x in IGNORED_TITLES):
+            title = ' '.join(title.split())
+            print(f"Titre trouvé : {title}")
+
+    # Extraire le contenu par sections
+    sections = []
+    for section in headings:
+        section_title = section.get_text(strip=True)
+        if section_title and not any(x in section_title.lower() for x in IGNORED_TITLES):
+            section_title = ' '.join(section_title.split())
+            sections.append(f"\n## {section_title}")
+
+            next_elem = section.next_sibling
+            section_content = []
+            while next_elem and next_elem.name not in BOFIP_HEADINGS:
+                if isinstance(next_elem, str):
+                    text = next_elem.strip()
+                    if text:
+                        section_content.append(text)
+                elif next_elem.name in BOFIP_BLOCKS:
+                    text = block_texts.get(id(next_elem))
+                    if text is None:
+                        text = next_elem.get_text(strip=True)
+                    if text:
+                        section_content.append(text)
+                next_elem = next_elem.next_sibling
+
+            if section_content:
+                sections.append(' '.join(' '.join(section_content).split()))
+
+    document = None
+    if sections:
+        document = {
+            'url': current_url,
+            'title': title,
+            'content': "\n\n".join(sections)
+        }
+        print(f"✓ {len(sections)} sections extraites")
+
+    # Chercher tous les liens
+    new_urls = {}
+    for link in links:
+        href = link.get('href')
+        text = link.get_text(strip=True)
+        # 1. Lien "Document suivant"
+        if text == 'Document suivant' and href and 'identifiant=' in href:
+            doc_id = href.split('identifiant=')[-1]
+            if '%23' in doc_id:
+                doc_id = doc_id.split('%23')[0]
+            new_urls[f"{BOFIP_BASE_URL}/bofip/{doc_id}"] = PRIORITY_NEXT_DOCUMENT
+            print(f"→ Document suivant trouvé : {doc_id}")
+        # 2. Références BOI-ENR-DMTG
+        if ('BOI-' in text or 'succession' in text.lower()) and href and href != current_url:
+            new_urls.setdefault(normalize_bofip_url(href), None)
+
+    # 3. Chercher les références dans le texte
+    for block in blocks:
+        if 'BOI-' in block_texts[id(block)]:
+            for url in extract_boi_references(block.get_text(' ', strip=True)):
+                new_urls.setdefault(url, None)
+
+    new_urls.pop(current_url, None)
+    return document, new_urls
@@ -0,0 +1,128 @@
+import time
+import asyncio
+
+_CLOSED = object()
+
+class PipelineStage:
+    """Étape d'un pipeline : une file bornée consommée par un groupe de workers
+
+    Le handler reçoit un élément (ou une liste d'au plus batch_size éléments déjà
+    disponibles dans la file) et retourne les éléments à transmettre à l'étape
+    suivante (itérable ou None). Une file pleine bloque l'étape précédente.
+    """
+    def __init__(self, name, handler, workers=1, queue_size=50, batch_size=None):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.queue = None
+        self.next = None
+        self.inputs = 0  # Étape précédente et producteurs encore actifs
+        self.stats = {'in': 0, 'out': 0, 'errors': 0, 'busy': 0.0, 'max_queue': 0}
+
+    async def put(self, item):
+        await self.queue.put(item)
+        self.stats['max_queue'] = max(self.stats['max_queue'], self.queue.qsize())
+
+    async def close_input(self):
+        """Signale qu'une entrée est terminée ; les workers s'arrêtent quand toutes le sont"""
+        self.inputs -= 1
+        if self.inputs == 0:
+            for _ in range(self.workers):
+                await self.queue.put(_CLOSED)
+
+    def next_items(self, item):
+        """Complète un lot avec les éléments déjà disponibles dans la file"""
+        items = [item]
+        closed = False
+        while len(items) < self.batch_size and not self.queue.empty():
+            extra = self.queue.get_nowait()
+            if extra is _CLOSED:
+                closed = True
+                break
+            items.append(extra)
+        return items, closed
+
+    async def worker(self):
+        while True:
+            item = await self.queue.get()
+            if item is _CLOSED:
+                return
+            closed = False
+            if self.batch_size:
+                item, closed = self.next_items(item)
+                self.stats['in'] += len(item)
+            else:
+                self.stats['in'] += 1
+            start = time.perf_counter()
+            try:
+                outputs = await self.handler(item)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Erreur dans l'étape {self.name} : {str(e)}")
+                outputs = None
+            self.stats['busy'] += time.perf_counter() - start
+            for output in outputs or []:
+                self.stats['out'] += 1
+                if self.next:
+                    await self.next.put(output)
+            if closed:
+                return
+
+    async def run(self):
+        await asyncio.gather(*(self.worker() for _ in range(self.workers)))
+        if self.next:
+            await self.next.close_input()
+
+class Pipeline:
+    """Enchaîne des étapes à files bornées, alimentées par des producteurs asynchrones
+
+    Chaque étape a son propre nombre de workers : réseau, parsing et appels au modèle
+    se recouvrent, et les files bornées limitent la mémoire utilisée.
+    """
+    def __init__(self, stages):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+        self.producers = []
+        self.elapsed = 0.0
+
+    def stage(self, name):
+        return next(stage for stage in self.stages if stage.name == name)
+
+    def add_producer(self, name, producer):
+        """Ajoute un producteur : fonction async recevant la fonction d'envoi vers l'étape name"""
+        self.producers.append((self.stage(name), producer))
+
+    async def run_producer(self, stage, producer):
+        try:
+            await producer(stage.put)
+        except Exception as e:
+            print(f"Erreur du producteur de l'étape {stage.name} : {str(e)}")
+        finally:
+            await stage.close_input()
+
+    async def run(self):
+        start = time.perf_counter()
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(stage.queue_size)
+            stage.inputs = sum(1 for s in self.stages if s.next is stage)
+            stage.inputs += sum(1 for s, _ in self.producers if s is stage)
+        tasks = [asyncio.create_task(stage.run()) for stage in self.stages]
+        # Une étape sans aucune entrée se termine immédiatement
+        for stage in self.stages:
+            if stage.inputs == 0:
+                stage.inputs = 1
+                await stage.close_input()
+        await asyncio.gather(*(self.run_producer(stage, producer) for stage, producer in self.producers))
+        await asyncio.gather(*tasks)
+        self.elapsed = time.perf_counter() - start
+
+    def print_report(self):
+        """Affiche l'activité de chaque étape"""
+        print(f"✓ Pipeline terminé en {self.elapsed:.1f}s")
+        for stage in self.stages:
+            s = stage.stats
+            print(f"  - {stage.name} ({stage.workers} workers) : {s['in']} entrées, {s['out']} sorties, "
+                  f"{s['errors']} erreurs, occupé {s['busy']:.1f}s, file max {s['max_queue']}/{stage.queue_size}")
@@ -0,0 +1,123 @@
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from candidate_pairs import normalize_text
+from embedding_cache import EmbeddingCache
+
+class QueryEmbeddingCache:
+    """Cache des embeddings de requêtes : LRU en mémoire devant un cache disque
+
+    Les clés sont calculées sur le texte normalisé (casse, accents, ponctuation et
+    espaces ignorés) et le modèle, si bien que des requêtes quasi identiques partagent
+    le même embedding. Les entrées plus anciennes que ttl secondes sont recalculées.
+
+    L'index disque est réécrit toutes les save_every modifications et à l'arrêt du
+    programme, pas à chaque nouvelle requête.
+    """
+    def __init__(self, path='query_embedding_cache', dimension=1536, memory_entries=256,
+                 max_entries=5000, ttl=30 * 86400, save_every=20):
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.save_every = save_every
+        self.unsaved = 0  # modifications du cache disque non encore écrites
+        self.memory = OrderedDict()  # clé -> (vecteur, date de création)
+        self.disk = EmbeddingCache(path, dimension=dimension, max_entries=max_entries)
+        self.lock = threading.Lock()
+        atexit.register(self.save)
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'expired': 0
+        }
+
+    @staticmethod
+    def make_key(model, text):
+        return EmbeddingCache.make_key(model, normalize_text(text))
+
+    def remember(self, key, vector, created):
+        """Place une entrée en tête du LRU mémoire"""
+        self.memory[key] = (vector, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, model, text):
+        """Retourne (vecteur, origine) avec origine 'memory' ou 'disk', ou (None, None)"""
+        key = self.make_key(model, text)
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                vector, created = entry
+                if now - created <= self.ttl:
+                    self.memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return vector, 'memory'
+                del self.memory[key]
+
+            created = self.disk.created_at(key)
+            if created is not None:
+                if now - created <= self.ttl:
+                    vector = self.disk.get(key)
+                    self.remember(key, vector, created)
+                    self.stats['disk_hits'] += 1
+                    return vector, 'disk'
+                self.disk.remove(key)
+                self.unsaved += 1
+                self.stats['expired'] += 1
+
+            self.stats['misses'] += 1
+            return None, None
+
+    def put(self, model, text, vector):
+        """Enregistre un embedding en mémoire et sur disque"""
+        key = self.make_key(model, text)
+        with self.lock:
+            self.remember(key, vector, time.time())
+            self.disk.put(key, vector)
+            self.unsaved += 1
+            if self.unsaved >= self.save_every:
+                self.save_locked()
+
+    def save_locked(self):
+        self.disk.save()  # index.json écrit dans un fichier temporaire puis os.replace
+        self.unsaved = 0
+
+    def save(self):
+        """Écrit sur disque les modifications en attente (appelé aussi à l'arrêt du programme)"""
+        with self.lock:
+            if self.unsaved:
+                self.save_locked()
+
+    def embed(self, model, text, create):
+        """Retourne (vecteur, origine) en n'appelant create(text) qu'en l'absence d'entrée valide"""
+        vector, origin = self.get(model, text)
+        if vector is None:
+            vector = create(text)
+            self.put(model, text, vector)
+            origin = 'api'
+        return vector, origin
+
+    def hit_rate(self):
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+    def diagnostics(self):
+        """Compteurs du cache, joints aux résultats de recherche"""
+        return {
+            **self.stats,
+            'hit_rate': round(self.hit_rate(), 3),
+            'memory_entries': len(self.memory),
+            'disk_entries': len(self.disk.entries)
+        }
+
+    def print_report(self):
+        """Affiche les statistiques d'utilisation du cache"""
+        s = self.stats
+        print(f"✓ Cache des requêtes : {s['memory_hits']} hits mémoire, {s['disk_hits']} hits disque, "
+              f"{s['misses']} misses ({100 * self.hit_rate():.0f}% de hits)")
+        print(f"  - {len(self.memory)} requêtes en mémoire, {len(self.disk.entries)} sur disque, "
+              f"{s['expired']} expirées")
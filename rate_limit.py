@@ -0,0 +1,33 @@
+import time
+import asyncio
+
+class TokenBucket:
+    """Limiteur de débit asynchrone (seau à jetons)"""
+    def __init__(self, rate, capacity=1):
+        self.rate = rate  # Jetons ajoutés par seconde
+        self.capacity = capacity  # Nombre maximum de requêtes en rafale
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def is_rate_limit_error(error):
+    """Indique si une exception correspond à un dépassement de quota (HTTP 429)"""
+    message = str(error)
+    return '429' in message or 'quota' in message.lower() or 'ResourceExhausted' in type(error).__name__
+
+def is_expired_key_error(error):
+    """Indique si une exception correspond à une clé API expirée ou invalide"""
+    message = str(error)
+    return 'API key expired' in message or 'API_KEY_INVALID' in message or 'API key not valid' in message
@@ -0,0 +1,105 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+from content_fingerprints import content_text
+
+def content_hash(content):
+    """Hash d'un contenu à analyser (texte brut ou document BOFiP)"""
+    return hashlib.sha256(content_text(content).encode('utf-8')).hexdigest()
+
+class ScrapeCheckpoint:
+    """Journal de reprise du scraper
+
+    Enregistre (une ligne JSON par événement) les couples (requête, source) terminés,
+    les contenus déjà analysés par Gemini et les documents BOFiP crawlés en attente
+    d'analyse, pour qu'une exécution interrompue puisse reprendre sans refaire ce travail.
+    Un contenu dont l'analyse a échoué n'est pas enregistré : il est analysé à nouveau
+    lors de la reprise.
+
+    Seuls les hash sont gardés en mémoire : le texte des documents BOFiP en attente est
+    relu depuis le journal au moment de la reprise.
+    """
+    def __init__(self, path='scrape_checkpoint.jsonl'):
+        self.path = path
+        self.fetched = set()  # (requête, source)
+        self.analyzed = set()  # hash des contenus analysés
+        self.bofip_documents = set()  # hash des documents crawlés (texte dans le journal)
+        self.file = None
+
+    def entries(self):
+        """Parcourt les événements enregistrés dans le journal"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def load(self):
+        """Charge les événements d'une exécution précédente"""
+        for entry in self.entries():
+            if entry['type'] == 'fetched':
+                self.fetched.add((entry['query'], entry['source']))
+            elif entry['type'] == 'analyzed':
+                self.analyzed.add(entry['hash'])
+            elif entry['type'] == 'bofip_document':
+                self.bofip_documents.add(entry['hash'])
+        print(f"✓ Reprise : {len(self.fetched)} requêtes terminées, {len(self.analyzed)} contenus déjà analysés")
+
+    def reset(self):
+        """Démarre une nouvelle exécution"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.fetched.clear()
+        self.analyzed.clear()
+        self.bofip_documents.clear()
+
+    def append(self, entry):
+        entry['ts'] = datetime.now().isoformat()
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.file.flush()
+
+    def is_fetched(self, query, source):
+        return (query, source) in self.fetched
+
+    def mark_fetched(self, query, source):
+        if (query, source) not in self.fetched:
+            self.fetched.add((query, source))
+            self.append({'type': 'fetched', 'query': query, 'source': source})
+
+    def is_analyzed(self, content):
+        return content_hash(content) in self.analyzed
+
+    def mark_analyzed(self, content):
+        """Enregistre un contenu analysé avec succès (même si aucune clause n'a été trouvée)"""
+        digest = content_hash(content)
+        if digest not in self.analyzed:
+            self.analyzed.add(digest)
+            self.append({'type': 'analyzed', 'hash': digest})
+
+    def add_bofip_document(self, document):
+        """Conserve un document BOFiP crawlé jusqu'à son analyse"""
+        digest = content_hash(document)
+        if digest not in self.bofip_documents:
+            self.bofip_documents.add(digest)
+            self.append({'type': 'bofip_document', 'hash': digest, 'document': document})
+
+    def pending_bofip_documents(self):
+        """Documents BOFiP crawlés mais pas encore analysés, relus un à un depuis le journal"""
+        pending = {digest for digest in self.bofip_documents if digest not in self.analyzed}
+        for entry in self.entries():
+            if entry['type'] == 'bofip_document' and entry['hash'] in pending:
+                pending.discard(entry['hash'])
+                yield entry['document']
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -1,81 +1,116 @@
 import os
+import copy
 import json
 import time
 import asyncio
-import aiohttp
+from contextlib import contextmanager
 from datetime import datetime
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-import google.generativeai as genai
-from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
 import re
+from crawl_frontier import CrawlFrontier, PRIORITY_NEXT_DOCUMENT
+import parsers
+from clause_store import ClauseStore
+from rate_limit import TokenBucket
+from llm_pool import LLMClientPool
+from scrape_checkpoint import ScrapeCheckpoint
+from http_cache import HttpCache
+from http_client import HttpClient, FetchResult
+from pipeline import Pipeline, PipelineStage
+from content_fingerprints import ContentFingerprintIndex, content_text
 
 class SuccessionScraper:
-    def __init__(self):
-        """Initialise le scraper avec les sources et les données"""
-        load_dotenv()
+    def __init__(self, offline=False, use_lxml=False, pool=None):
+        """Initialise le scraper avec les sources et les données
         
-        # Charger toutes les clés API Gemini depuis .env
-        self.api_keys = []
-        for i in range(1, 6):  # Chercher jusqu'à 5 clés
-            key = os.getenv(f'GEMINI_API_KEY_{i}')
-            if key:
-                self.api_keys.append(key)
-            elif i == 1:  # Si pas de clé numérotée, essayer la clé par défaut
-                key = os.getenv('GEMINI_API_KEY')
-                if key:
-                    self.api_keys.append(key)
-                    
-        if not self.api_keys:
-            raise ValueError("Aucune clé API Gemini trouvée dans .env")
-            
-        print(f"✓ {len(self.api_keys)} clés API Gemini chargées")
+        Args:
+            offline: Si True, rejoue les pages du cache HTTP sans accès réseau
+            use_lxml: Utiliser le parser lxml (plus rapide) s'il est installé, au lieu de html.parser
+            pool: LLMClientPool existant à partager (par défaut un modèle par clé de .env)
+        """
+        load_dotenv()
         
-        # Créer un modèle pour chaque clé
-        self.models = []
-        for key in self.api_keys:
-            genai.configure(api_key=key)
-            self.models.append(genai.GenerativeModel('gemini-pro'))
-            
-        # Index du prochain modèle à utiliser
-        self.current_model = 0
+        # Pool des clés API Gemini (budgets, concurrence adaptative, quarantaine sur 429)
+        self.pool = pool or LLMClientPool.from_gemini_env()
+        print(f"✓ {len(self.pool)} clés API Gemini chargées")
         
         self.sources = {
             "legifrance": {
                 "base_url": "https://www.legifrance.gouv.fr",
                 "search_url": "https://www.legifrance.gouv.fr/search/all?tab_selection=all&searchField=ALL&query={query}",
-                "parser": self.parse_legifrance
+                "max_connections": 4,  # Connexions simultanées vers l'hôte
+                "cache_ttl": 24 * 3600  # Durée de validité du cache HTTP (secondes)
             },
             "service_public": {
                 "base_url": "https://www.service-public.fr",
                 "search_url": "https://www.service-public.fr/particuliers/recherche?keyword={query}",
-                "parser": self.parse_service_public
+                "max_connections": 4,
+                "cache_ttl": 7 * 24 * 3600
             },
             "bofip": {
                 "start_url": "https://bofip.impots.gouv.fr/bofip/1500-PGP",  # URL de base des successions
                 "search_url": "https://bofip.impots.gouv.fr/recherche/results?search={query}",
-                "parser": self.parse_bofip
+                "max_connections": 4,
+                "cache_ttl": 30 * 24 * 3600  # Vérification mensuelle
             }
         }
         self.visited_bofip_urls = set()
         
-        # Charger les données existantes
+        # Paramètres du crawling concurrent
+        self.crawl_concurrency = 4  # Nombre de pages récupérées simultanément
+        self.host_rate = 2.0  # Requêtes par seconde et par hôte
+        self.host_burst = 2  # Rafale autorisée par hôte
+        self.host_limiters = {}
+        # Parsing HTML dans des processus séparés pour ne pas bloquer la boucle asyncio
+        self.html_features = parsers.html_features(use_lxml)
+        # (pool de processus ouvert seulement pendant une exécution, voir parsing_pool)
+        self.parse_workers = min(4, os.cpu_count() or 1)
+        self.parse_executor = None
+        
+        # Regroupement des contenus dans les requêtes Gemini
+        self.max_content_chars = 5000  # Troncature de chaque contenu
+        self.pack_token_budget = 6000  # Tokens de contenu par requête (≈ 4 caractères/token)
+        self.pack_max_documents = 8
+        
+        # Pipeline de scraping : workers par étape (analyse : un par clé si None) et taille des files
+        self.pipeline_workers = {'fetch': 8, 'parse': 4, 'analyze': None, 'convert': 2}
+        self.pipeline_queue_size = 50
+        self.fetch_timings = {}  # source -> pages récupérées et durée cumulée
+        
+        # Cache des réponses HTTP (revalidation conditionnelle, rejeu hors ligne)
+        self.http_cache = HttpCache('http_cache', offline=offline)
+        
+        # Client HTTP partagé (pool de connexions, limites par hôte, nouvelles tentatives)
+        host_limits = {}
+        for source_info in self.sources.values():
+            host = urlparse(source_info.get('base_url') or source_info['start_url']).netloc
+            host_limits[host] = source_info['max_connections']
+        self.http = HttpClient(host_limits=host_limits)
+        
+        # Charger les données existantes (snapshot + journal des modifications)
+        self.store = ClauseStore('succession_data_unified.json')
         self.data = self.load_data()
         
         # Charger l'état du crawling
         self.crawler_state = self.load_crawler_state()
         
+        # Clauses déjà obtenues pour chaque contenu analysé
+        self.fingerprints = ContentFingerprintIndex('content_fingerprints.jsonl',
+                                                    max_content_chars=self.max_content_chars)
+        
+        # Journal de reprise des exécutions interrompues
+        self.checkpoint = ScrapeCheckpoint('scrape_checkpoint.jsonl')
+        
     def load_data(self):
         """Charge les données existantes"""
         try:
-            with open('succession_data_unified.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                print(f"✓ Données chargées : {len(data['clauses'])} clauses existantes")
-                return data
+            data = self.store.load()
+            print(f"✓ Données chargées : {len(data['clauses'])} clauses existantes")
+            return data
         except FileNotFoundError:
             print("Premier lancement du scraper, création d'un nouveau fichier de données")
-            return {
+            return self.store.load(default={
                 'metadata': {
                     'last_update': datetime.now().isoformat(),
                     'version': '1.0',
@@ -87,139 +122,210 @@ class SuccessionScraper:
                     }
                 },
                 'clauses': {}
-            }
+            })
             
     def load_crawler_state(self):
         """Charge l'état du crawler depuis le fichier JSON"""
+        if self.http_cache.offline:
+            # Le rejeu hors ligne repart de la page de départ sans toucher à l'état réel
+            return {
+                'pending_urls': CrawlFrontier(normalize=self.normalize_bofip_url),
+                'visited_urls': set(),
+                'last_update': datetime.now().isoformat()
+            }
         try:
             with open('crawler_state.json', 'r', encoding='utf-8') as f:
                 state = json.load(f)
-                # Convertir visited_urls en set
+                # Convertir visited_urls en set et pending_urls en file de priorité dédupliquée
                 state['visited_urls'] = set(state['visited_urls'])
+                state['pending_urls'] = CrawlFrontier.from_state(
+                    state['pending_urls'], normalize=self.normalize_bofip_url
+                )
                 print(f"✓ État du crawler chargé : {len(state['pending_urls'])} URLs en attente")
                 return state
         except FileNotFoundError:
             print("Premier lancement du crawler, création d'un nouvel état")
             return {
-                'pending_urls': [],
+                'pending_urls': CrawlFrontier(normalize=self.normalize_bofip_url),
                 'visited_urls': set(),
                 'last_update': datetime.now().isoformat()
             }
             
     def save_crawler_state(self):
         """Sauvegarde l'état du crawler"""
+        if self.http_cache.offline:
+            return
         state = {
-            'pending_urls': list(self.crawler_state['pending_urls']),
-            'visited_urls': list(self.crawler_state['visited_urls']),
+            'pending_urls': self.crawler_state['pending_urls'].to_state(),
+            'visited_urls': sorted(self.crawler_state['visited_urls']),
             'last_update': datetime.now().isoformat()
         }
+        # Format compact : l'état peut contenir des dizaines de milliers d'URLs
         with open('crawler_state.json', 'w', encoding='utf-8') as f:
-            json.dump(state, f, ensure_ascii=False, indent=4)
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
         print(f"✓ État du crawler sauvegardé")
 
-    def get_next_model(self):
-        """Retourne le prochain modèle à utiliser, en rotation"""
-        model = self.models[self.current_model]
-        self.current_model = (self.current_model + 1) % len(self.models)
-        return model
-
-    async def fetch_url(self, session, url, source_type):
-        """Récupère le contenu d'une URL avec gestion des erreurs"""
+    async def fetch_page(self, client, url, source_type):
+        """Récupère une page en passant par le cache HTTP
+        
+        Returns:
+            FetchResult ; body vaut None en cas d'erreur, et unchanged vaut True si la
+            page n'a pas changé depuis son dernier traitement complet, auquel cas
+            parsing et analyse sont inutiles
+        """
+        start = time.perf_counter()
+        result = FetchResult(url=url, source=source_type)
+        entry = self.http_cache.get(url)
+        if self.http_cache.offline:
+            if entry is None:
+                print(f"Page absente du cache (mode hors ligne) : {url}")
+                return result
+            self.http_cache.hits += 1
+            result.status, result.body, result.origin = 200, entry['body'], 'offline'
+            result.elapsed = time.perf_counter() - start
+            return result
+        
+        ttl = self.sources.get(source_type, {}).get('cache_ttl')
+        if entry and self.http_cache.is_fresh(entry, ttl):
+            self.http_cache.hits += 1
+            result.status, result.body, result.origin = 200, entry['body'], 'cache'
+            result.unchanged = entry['processed']
+            result.elapsed = time.perf_counter() - start
+            return result
+        
         try:
-            async with session.get(url) as response:
-                if response.status == 404:
-                    print(f"Erreur 404 pour {source_type}: {url}")
-                    return None
-                elif response.status != 200:
-                    print(f"Erreur {response.status} pour {source_type}: {url}")
-                    return None
-                    
-                content = await response.text()
-                if not content:
-                    print(f"Contenu vide pour {source_type}: {url}")
-                    return None
-                    
-                # Vérifier si c'est une page d'erreur BOFiP
-                if source_type == 'bofip' and 'Cette page n\'existe pas' in content:
-                    print(f"Page inexistante sur BOFiP: {url}")
-                    return None
-                    
-                return content
+            headers = self.http_cache.conditional_headers(entry)
+            response = await client.get(url, headers=headers)
+            result.status = response.status
+            result.elapsed = time.perf_counter() - start
+            if response.status == 304 and entry:
+                self.http_cache.revalidated += 1
+                self.http_cache.touch(entry)
+                result.body, result.origin = entry['body'], 'revalidated'
+                result.unchanged = entry['processed']
+                return result
+            elif response.status == 404:
+                print(f"Erreur 404 pour {source_type}: {url}")
+                return result
+            elif response.status != 200:
+                print(f"Erreur {response.status} pour {source_type}: {url}")
+                return result
+                
+            content = response.text
+            if not content:
+                print(f"Contenu vide pour {source_type}: {url}")
+                return result
+                
+            # Vérifier si c'est une page d'erreur BOFiP
+            if source_type == 'bofip' and 'Cette page n\'existe pas' in content:
+                print(f"Page inexistante sur BOFiP: {url}")
+                return result
+            
+            self.http_cache.misses += 1
+            entry = self.http_cache.store(url, source_type, content, response.headers, entry)
+            result.body = content
+            result.unchanged = entry['processed']
+            return result
                 
         except Exception as e:
             print(f"Erreur lors de la récupération de {url}: {str(e)}")
-            return None
+            result.elapsed = time.perf_counter() - start
+            return result
 
-    async def scrape_sources(self, query):
-        """Scrape toutes les sources en parallèle"""
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for source_name, source_info in self.sources.items():
-                if source_name != "bofip":
-                    url = source_info['search_url'].format(query=query)
-                    tasks.append(self.fetch_url(session, url, source_name))
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            parsed_results = []
-            
-            for source_name, (source_info, content) in zip(self.sources.keys(), zip(self.sources.values(), results)):
-                if source_name != "bofip" and content and not isinstance(content, Exception):
-                    try:
-                        parsed = source_info['parser'](content)
-                        if parsed:
-                            parsed_results.extend(parsed)
-                    except Exception as e:
-                        print(f"Erreur lors du parsing de {source_name}: {str(e)}")
-            
-            return parsed_results
+    def pack_contents(self, items):
+        """Regroupe les contenus en paquets tenant dans le budget de tokens d'une requête
+        
+        Args:
+            items: Liste de (contenu, empreinte)
+        """
+        packs = []
+        current = []
+        current_tokens = 0
+        for item in items:
+            tokens = min(len(content_text(item[0])), self.max_content_chars) // 4
+            if current and (current_tokens + tokens > self.pack_token_budget
+                            or len(current) >= self.pack_max_documents):
+                packs.append(current)
+                current = []
+                current_tokens = 0
+            current.append(item)
+            current_tokens += tokens
+        if current:
+            packs.append(current)
+        return packs
 
     async def analyze_content_batch(self, batch):
-        """Analyse un lot de contenus en parallèle avec plusieurs modèles Gemini"""
+        """Analyse un lot de contenus en parallèle avec les clés du pool Gemini
+        
+        Les contenus identiques ou quasi identiques à un contenu déjà analysé reprennent
+        les clauses enregistrées sans appel au modèle, y compris quand l'analyse n'en
+        avait trouvé aucune (seuls les échecs sont redemandés). Les autres sont regroupés à
+        plusieurs par requête (voir pack_contents) ; le pool règle le débit et la
+        concurrence de chaque clé.
+        
+        Returns:
+            Liste de (contenu, clauses) pour chaque contenu du lot, clauses valant None si
+            l'analyse a échoué ; le contenu vaut None pour les clauses que le modèle n'a
+            rattachées à aucun document
+        """
         results = []
         
         print(f"\nAnalyse de {len(batch)} contenus...")
-        batch_size = min(5, len(self.models))  # Taille du lot basée sur le nombre de modèles
         
-        # Traiter par petits lots
-        for i in range(0, len(batch), batch_size):
-            current_batch = batch[i:i+batch_size]
-            print(f"\nTraitement du lot {i//batch_size + 1}/{(len(batch) + batch_size - 1)//batch_size}...")
-            
-            # Créer les tâches d'analyse en parallèle
-            tasks = []
-            for content in current_batch:
-                model = self.get_next_model()
-                tasks.append(self.analyze_single_content(content, model))
-            
-            # Exécuter les analyses en parallèle
-            batch_results = await asyncio.gather(*tasks)
-            
-            # Traiter les résultats
-            for clauses in batch_results:
+        # Réutiliser les analyses précédentes et dédoublonner le lot
+        to_analyze = {}  # hash -> (contenu, empreinte)
+        duplicates = {}  # hash -> autres copies du contenu dans le lot
+        for content in batch:
+            fingerprint = self.fingerprints.fingerprint(content)
+            if fingerprint[0] in to_analyze:
+                duplicates.setdefault(fingerprint[0], []).append(content)
+                continue
+            clauses = self.fingerprints.lookup(content, fingerprint)
+            if clauses is not None:
+                results.append((content, clauses))
+                print(f"✓ {len(clauses)} clauses reprises d'une analyse précédente")
+            else:
+                to_analyze[fingerprint[0]] = (content, fingerprint)
+        packs = self.pack_contents(list(to_analyze.values()))
+        if packs:
+            print(f"{len(to_analyze)} contenus à analyser en {len(packs)} requêtes")
+        
+        # Exécuter les analyses en parallèle
+        pack_results = await asyncio.gather(*[
+            self.analyze_content_pack([content for content, _ in pack]) for pack in packs
+        ])
+        
+        # Traiter les résultats
+        for pack, (per_document, unassigned) in zip(packs, pack_results):
+            for (content, fingerprint), clauses in zip(pack, per_document):
                 if clauses:
-                    results.extend(clauses)
+                    self.fingerprints.add(content, clauses, fingerprint)
+                    results.append((content, clauses))
                     print(f"✓ {len(clauses)} clauses trouvées")
+                elif clauses is None:
+                    results.append((content, None))
+                    print("✗ Échec de l'analyse, contenu à redemander")
                 else:
+                    # Analyse réussie sans clause : inutile de redemander ce contenu,
+                    # sauf si des clauses du lot n'ont pu être rattachées à un document
+                    if not unassigned:
+                        self.fingerprints.add(content, [], fingerprint)
+                    results.append((content, []))
                     print("✗ Aucune clause trouvée")
-            
-            # Petite pause entre les lots
-            await asyncio.sleep(2)
+                # Les copies reçoivent les clauses de la première, comme pour une analyse précédente
+                for duplicate in duplicates.get(fingerprint[0], []):
+                    results.append((duplicate, copy.deepcopy(clauses)))
+            if unassigned:
+                results.append((None, unassigned))
+                print(f"⚠️ {len(unassigned)} clauses sans document d'origine")
             
         return results
 
-    async def analyze_single_content(self, content, model=None):
-        """Analyse un contenu avec un modèle Gemini spécifique"""
-        if model is None:
-            model = self.get_next_model()
-            
-        max_retries = 5
-        base_delay = 2
-        
-        for attempt in range(max_retries):
-            try:
-                content_truncated = content[:5000] if len(content) > 5000 else content
-                
-                prompt = f"""Tu es un expert juridique. Analyse ce texte sur les successions et retourne UNIQUEMENT un objet JSON valide sans texte avant ou après.
+    def build_analysis_prompt(self, contents):
+        """Construit la requête d'extraction des clauses pour un ou plusieurs contenus"""
+        texts = [content_text(content)[:self.max_content_chars] for content in contents]
+        if len(texts) == 1:
+            return f"""Tu es un expert juridique. Analyse ce texte sur les successions et retourne UNIQUEMENT un objet JSON valide sans texte avant ou après.
 
 Format JSON attendu :
 {{
@@ -241,25 +347,81 @@ IMPORTANT:
 4. Ne mets pas de virgule après le dernier élément
 
 Texte à analyser :
-{content_truncated}"""
+{texts[0]}"""
+        
+        documents = "\n\n".join(f"=== Document {i} ===\n{text}" for i, text in enumerate(texts, 1))
+        return f"""Tu es un expert juridique. Analyse ces {len(texts)} documents sur les successions et retourne UNIQUEMENT un objet JSON valide sans texte avant ou après.
 
-                # Ajouter un délai entre les appels
-                await asyncio.sleep(1)
-                
-                try:
-                    response = await model.generate_content_async(prompt)
-                except Exception as e:
-                    if "API key expired" in str(e):
-                        # Retirer la clé expirée
-                        print(f"Clé API expirée, suppression de la clé...")
-                        self.models.remove(model)
-                        if not self.models:
-                            raise ValueError("Toutes les clés API sont expirées !")
-                        # Utiliser le prochain modèle disponible
-                        model = self.get_next_model()
-                        continue
-                    else:
-                        raise e
+Format JSON attendu :
+{{
+    "clauses": [
+        {{
+            "document": 1,
+            "titre": "Titre de la clause",
+            "texte": "Texte exact de la clause",
+            "explication": "Explication simple",
+            "conditions": "Conditions d'application",
+            "exceptions": "Exceptions éventuelles"
+        }}
+    ]
+}}
+
+IMPORTANT:
+1. Retourne UNIQUEMENT le JSON, pas de texte avant ou après
+2. Utilise des guillemets doubles pour les clés et les valeurs
+3. Échappe les guillemets dans le texte avec \"
+4. Ne mets pas de virgule après le dernier élément
+5. "document" est le numéro du document dont la clause est extraite
+
+Documents à analyser :
+{documents}"""
+
+    async def analyze_content_pack(self, contents):
+        """Analyse plusieurs contenus en une seule requête
+        
+        Returns:
+            (clauses de chaque contenu, clauses sans numéro de document valide) ; les
+            clauses de chaque contenu valent None si la requête a échoué
+        """
+        clauses = await self.request_clauses(self.build_analysis_prompt(contents))
+        if clauses is None:
+            return [None for _ in contents], []
+        if len(contents) == 1:
+            for clause in clauses:
+                if isinstance(clause, dict):
+                    clause.pop('document', None)
+            return [clauses], []
+        
+        per_document = [[] for _ in contents]
+        unassigned = []
+        for clause in clauses:
+            index = clause.pop('document', None) if isinstance(clause, dict) else None
+            try:
+                index = int(index)
+            except (TypeError, ValueError):
+                index = None
+            # Numérotation à partir de 1 : un numéro 0 ou négatif n'indexe pas la liste
+            if index is not None and 1 <= index <= len(contents):
+                per_document[index - 1].append(clause)
+            else:
+                unassigned.append(clause)
+        return per_document, unassigned
+
+    async def request_clauses(self, prompt):
+        """Envoie une requête d'extraction à Gemini et retourne la liste des clauses
+        
+        Les erreurs 429 et les clés expirées sont gérées par le pool ; les réponses
+        vides ou invalides sont redemandées.
+        
+        Returns:
+            Liste des clauses (éventuellement vide), ou None si toutes les tentatives ont échoué
+        """
+        max_retries = 5
+        base_delay = 2
+        
+        for attempt in range(max_retries):
+            try:
+                response = await self.pool.generate(prompt)
 
                 if not response:
                     print(f"Pas de réponse de Gemini (tentative {attempt + 1}/{max_retries})")
@@ -298,226 +460,152 @@ Texte à analyser :
                     continue
                     
             except Exception as e:
-                if "429" in str(e):
-                    delay = base_delay * (2 ** attempt)
-                    print(f"Limite de quota Gemini atteinte, attente de {delay} secondes...")
-                    await asyncio.sleep(delay)
+                if not len(self.pool):
+                    raise
+                print(f"Erreur lors de l'analyse avec Gemini: {str(e)}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(base_delay)
                     continue
-                else:
-                    print(f"Erreur lors de l'analyse avec Gemini: {str(e)}")
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(base_delay)
-                        continue
                     
-        return []
+        return None
 
-    def parse_legifrance(self, content):
-        """Parse le contenu de Légifrance"""
-        soup = BeautifulSoup(content, 'html.parser')
-        results = []
-        # Rechercher dans les articles et les sections pertinentes
-        for element in soup.find_all(['article', 'div'], class_=['article-item', 'code-article', 'article-content']):
-            text = element.get_text(strip=True)
-            if len(text) > 100 and ('succession' in text.lower() or 'héritier' in text.lower() or 'testament' in text.lower()):
-                results.append(text)
-        return results
+    def get_host_limiter(self, url):
+        """Retourne le limiteur de débit associé à l'hôte d'une URL"""
+        host = urlparse(url).netloc
+        if host not in self.host_limiters:
+            self.host_limiters[host] = TokenBucket(self.host_rate, self.host_burst)
+        return self.host_limiters[host]
 
-    def parse_service_public(self, content):
-        """Parse le contenu de Service-Public.fr"""
-        soup = BeautifulSoup(content, 'html.parser')
-        results = []
-        # Rechercher dans les résultats de recherche et les sections de contenu
-        for element in soup.find_all(['div', 'section'], class_=['search-result', 'content-text', 'article-content']):
-            text = element.get_text(strip=True)
-            if len(text) > 100 and ('succession' in text.lower() or 'héritier' in text.lower() or 'testament' in text.lower()):
-                results.append(text)
-        return results
+    def normalize_bofip_url(self, url):
+        """Normalise une URL à crawler (ancre, URL relative)"""
+        return parsers.normalize_bofip_url(url)
 
-    def parse_bofip(self, content):
-        """Parse le contenu du BOFiP"""
-        soup = BeautifulSoup(content, 'html.parser')
-        results = []
+    @contextmanager
+    def parsing_pool(self):
+        """Ouvre le pool de processus de parsing, fermé à la fin du bloc
         
-        # On ne traite pas directement le contenu ici car c'est fait dans crawl_bofip
-        return results
-
-    def clean_bofip_url(self, url):
-        """Nettoie et normalise une URL BOFiP"""
-        if not url:
-            return None
-            
-        # Supprimer les ancres
-        if '%23' in url:
-            url = url.split('%23')[0]
-            
-        # Extraire l'identifiant BOI si présent
-        if 'BOI-' in url:
-            boi_match = re.search(r'BOI-[A-Z]+-[A-Z]+-\d+(?:-\d+)*(?:-\d+)*', url)
-            if boi_match:
-                boi_id = boi_match.group(0)
-                return f"https://bofip.impots.gouv.fr/bofip/{boi_id}"
-                
-        # Construire l'URL complète si nécessaire
-        if not url.startswith('http'):
-            url = f"https://bofip.impots.gouv.fr{url if url.startswith('/') else f'/{url}'}"
-            
-        return url
-
-    def extract_boi_references(self, text):
-        """Extrait les références BOI d'un texte"""
-        refs = set()
-        # Chercher les motifs BOI-XXX-XXX-XX...
-        matches = re.finditer(r'BOI-[A-Z]+-[A-Z]+-\d+(?:-\d+)*(?:-\d+)*', text)
-        for match in matches:
-            boi_id = match.group(0)
-            refs.add(f"https://bofip.impots.gouv.fr/bofip/{boi_id}")
-        return refs
+        Réentrant : un crawling lancé pendant run() réutilise le pool déjà ouvert.
+        """
+        if self.parse_executor is not None:
+            yield self.parse_executor
+            return
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+            self.parse_executor = executor
+            try:
+                yield executor
+            finally:
+                self.parse_executor = None
 
-    async def crawl_bofip(self, session):
-        """Parcourt les documents BOFiP en suivant les liens pertinents"""
+    async def crawl_bofip(self, client, max_pages=150, concurrency=None, on_document=None):
+        """Parcourt les documents BOFiP en suivant les liens pertinents
+        
+        Args:
+            max_pages: Nombre maximum de pages visitées
+            concurrency: Nombre de requêtes simultanées (par défaut self.crawl_concurrency)
+            on_document: Fonction async appelée avec chaque nouveau document extrait
+        
+        Returns:
+            Documents extraits ; liste vide avec on_document, les documents étant alors
+            transmis au fil de l'eau sans être conservés en mémoire
+        """
         results = []
+        documents_found = 0
+        concurrency = concurrency or self.crawl_concurrency
         
         # Initialiser les URLs à visiter
-        if not self.crawler_state['pending_urls']:
-            self.crawler_state['pending_urls'] = [self.sources["bofip"]["start_url"]]
+        frontier = self.crawler_state['pending_urls']
+        if not frontier:
+            frontier.push(self.sources["bofip"]["start_url"], PRIORITY_NEXT_DOCUMENT)
         
-        max_pages = 150  # Augmenté à 150 pages
         pages_visited = 0
+        in_flight = 0
+        state_changed = asyncio.Condition()
+        loop = asyncio.get_running_loop()
         
         print("\nDébut du crawling BOFiP...")
         print(f"URLs en attente : {len(self.crawler_state['pending_urls'])}")
         print(f"URLs déjà visitées : {len(self.crawler_state['visited_urls'])}")
+        print(f"Requêtes simultanées : {concurrency}")
         
-        while self.crawler_state['pending_urls'] and pages_visited < max_pages:
-            current_url = self.crawler_state['pending_urls'].pop(0)
-            
-            # Nettoyer l'URL
-            if '%23' in current_url:
-                current_url = current_url.split('%23')[0]
-            if not current_url.startswith('http'):
-                current_url = f"https://bofip.impots.gouv.fr{current_url if current_url.startswith('/') else f'/{current_url}'}"
+        def next_url():
+            """Retire la prochaine URL valide et non visitée de la file d'attente"""
+            while frontier:
+                url = frontier.pop()
+                # Vérifier si c'est une URL valide de BOFiP
+                if 'bofip.impots.gouv.fr' not in url:
+                    continue
+                # Éviter les boucles infinies
+                if url in self.crawler_state['visited_urls']:
+                    continue
+                return url
+            return None
+        
+        async def crawl_page(current_url):
+            nonlocal documents_found
+            result = await self.fetch_page(client, current_url, "bofip")
+            if not result.ok:
+                return
             
-            # Vérifier si c'est une URL valide de BOFiP
-            if not ('bofip.impots.gouv.fr' in current_url):
-                continue
-                
-            # Éviter les boucles infinies
-            if current_url in self.crawler_state['visited_urls']:
-                continue
-                
-            self.crawler_state['visited_urls'].add(current_url)
-            pages_visited += 1
-            print(f"\nAnalyse de : {current_url}")
+            # Le parsing est délégué à un processus pour ne pas bloquer les autres requêtes
+            document, new_urls = await loop.run_in_executor(
+                self.parse_executor, parsers.extract_bofip_page, result.body, current_url, self.html_features
+            )
+            # Une page inchangée depuis sa dernière analyse n'est suivie que pour ses liens
+            if document and not result.unchanged:
+                documents_found += 1
+                # Conserver le document jusqu'à son analyse en cas d'interruption
+                self.checkpoint.add_bofip_document(document)
+                if on_document:
+                    await on_document(document)
+                else:
+                    results.append(document)
             
-            try:
-                content = await self.fetch_url(session, current_url, "bofip")
-                if not content:
-                    continue
-                    
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Extraire le titre
-                title = ""
-                title_elem = soup.find('h1')
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    if not any(x in title.lower() for x in ['services', 'informations', 'contact']):
-                        title = ' '.join(title.split())
-                        print(f"Titre trouvé : {title}")
-                
-                # Extraire le contenu par sections
-                sections = []
-                main_sections = soup.find_all(['h1', 'h2', 'h3'])
-                for section in main_sections:
-                    section_title = section.get_text(strip=True)
-                    if section_title and not any(x in section_title.lower() for x in ['services', 'informations', 'contact']):
-                        section_title = ' '.join(section_title.split())
-                        sections.append(f"\n## {section_title}")
-                        
-                        next_elem = section.next_sibling
-                        section_content = []
-                        while next_elem and next_elem.name not in ['h1', 'h2', 'h3']:
-                            if isinstance(next_elem, str):
-                                text = next_elem.strip()
-                                if text:
-                                    section_content.append(text)
-                            elif next_elem.name in ['p', 'div']:
-                                text = next_elem.get_text(strip=True)
-                                if text:
-                                    section_content.append(text)
-                            next_elem = next_elem.next_sibling
-                        
-                        if section_content:
-                            content_text = ' '.join(' '.join(section_content).split())
-                            sections.append(content_text)
-                
-                if sections:
-                    results.append({
-                        'url': current_url,
-                        'title': title,
-                        'content': "\n\n".join(sections)
-                    })
-                    print(f"✓ {len(sections)} sections extraites")
-                
-                # Chercher tous les liens
-                new_urls = set()
-                
-                # 1. Chercher le lien "Document suivant"
-                for link in soup.find_all('a', href=True):
-                    if link.get_text(strip=True) == 'Document suivant':
-                        href = link.get('href')
-                        if href:
-                            if 'identifiant=' in href:
-                                doc_id = href.split('identifiant=')[-1]
-                                if '%23' in doc_id:
-                                    doc_id = doc_id.split('%23')[0]
-                                new_url = f"https://bofip.impots.gouv.fr/bofip/{doc_id}"
-                                if new_url not in self.crawler_state['visited_urls']:
-                                    new_urls.add(new_url)
-                                    print(f"→ Document suivant trouvé : {doc_id}")
-                
-                # 2. Chercher les références BOI-ENR-DMTG
-                for link in soup.find_all('a', href=True):
-                    href = link.get('href')
-                    text = link.get_text(strip=True)
-                    if ('BOI-' in text or 'succession' in text.lower()) and href and href != current_url:
-                        if '%23' in href:
-                            href = href.split('%23')[0]
-                        if not href.startswith('http'):
-                            new_url = f"https://bofip.impots.gouv.fr{href if href.startswith('/') else f'/{href}'}"
-                        else:
-                            new_url = href
-                        
-                        if new_url not in self.crawler_state['visited_urls']:
-                            new_urls.add(new_url)
-                            print(f"→ Document lié trouvé : {text}")
-                
-                # 3. Chercher les références dans le texte
-                for section in soup.find_all(['p', 'div']):
-                    text = section.get_text(strip=True)
-                    if 'BOI-' in text:
-                        matches = re.finditer(r'BOI-[A-Z]+-[A-Z]+-\d+(?:-\d+)*(?:-\d+)*', text)
-                        for match in matches:
-                            boi_id = match.group(0)
-                            new_url = f"https://bofip.impots.gouv.fr/bofip/{boi_id}"
-                            if new_url not in self.crawler_state['visited_urls']:
-                                new_urls.add(new_url)
-                                print(f"→ Référence trouvée dans le texte : {boi_id}")
-                
-                # Ajouter les nouvelles URLs au début de la liste pour les traiter en priorité
-                self.crawler_state['pending_urls'] = list(new_urls) + self.crawler_state['pending_urls']
-                
-                # Petite pause pour ne pas surcharger le serveur
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                print(f"Erreur lors du crawling de {current_url}: {str(e)}")
-                continue
+            # Ajouter les nouvelles URLs à la file selon leur priorité
+            for url, priority in new_urls.items():
+                if url not in self.crawler_state['visited_urls']:
+                    frontier.push(url, priority)
+        
+        async def worker():
+            nonlocal pages_visited, in_flight
+            while True:
+                async with state_changed:
+                    while True:
+                        if pages_visited >= max_pages:
+                            return
+                        current_url = next_url()
+                        if current_url:
+                            break
+                        # Plus rien à faire si aucune page n'est en cours de traitement
+                        if in_flight == 0:
+                            return
+                        await state_changed.wait()
+                    self.crawler_state['visited_urls'].add(current_url)
+                    pages_visited += 1
+                    in_flight += 1
+                
+                print(f"\nAnalyse de : {current_url}")
+                try:
+                    # Respecter la limite de débit de l'hôte plutôt qu'une pause fixe
+                    if not self.http_cache.offline:
+                        await self.get_host_limiter(current_url).acquire()
+                    await crawl_page(current_url)
+                except Exception as e:
+                    print(f"Erreur lors du crawling de {current_url}: {str(e)}")
+                finally:
+                    async with state_changed:
+                        in_flight -= 1
+                        state_changed.notify_all()
+                    # Sauvegarde régulière pour pouvoir reprendre un crawling interrompu
+                    if pages_visited % 10 == 0:
+                        self.save_crawler_state()
+        
+        with self.parsing_pool():
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
         
         if pages_visited >= max_pages:
             print(f"\n⚠️ Limite de {max_pages} pages atteinte")
         
-        print(f"\n✓ Crawling BOFiP terminé : {len(results)} documents analysés")
+        print(f"\n✓ Crawling BOFiP terminé : {documents_found} documents analysés")
         print(f"  - {pages_visited} pages visitées")
         print(f"  - {len(self.crawler_state['visited_urls'])} URLs uniques trouvées")
         print(f"  - {len(self.crawler_state['pending_urls'])} URLs en attente")
@@ -551,7 +639,7 @@ Texte à analyser :
             'description': clause['texte'],
             'conditions': [clause['conditions']] if isinstance(clause['conditions'], str) else clause['conditions'].split('\n'),
             'exceptions': [clause['exceptions']] if isinstance(clause['exceptions'], str) else clause['exceptions'].split('\n'),
-            'references': [],
+            'references': self.merge_references([], clause.get('references') or []),
             'mots_cles': [
                 word.lower() for word in re.findall(r'\w+', clause['titre'])
                 if len(word) > 2 and word.lower() not in ['les', 'des', 'pour', 'dans', 'avec']
@@ -589,171 +677,268 @@ Texte à analyser :
         print(f"✓ Clause convertie : {clause['titre']}")
         return clause_id, converted_clause
 
-    def update_data(self, new_clause, source_url=None):
-        """Met à jour les données avec une nouvelle clause"""
-        if not isinstance(new_clause, dict):
-            print(f"⚠️ Format de clause invalide pour la mise à jour : {type(new_clause)}")
-            return False
+    def merge_clause(self, clause_id, converted_clause, source_url=None):
+        """Ajoute une clause convertie ou la fusionne avec la clause existante"""
+        # Vérifier si la clause existe déjà
+        if clause_id in self.data['clauses']:
+            existing_clause = self.data['clauses'][clause_id]
             
-        try:
-            # Convertir la clause
-            result = self.convert_gemini_clause(new_clause, source_url)
-            if not result:
-                return False
-                
-            clause_id, converted_clause = result
+            # Mettre à jour les champs existants
+            existing_clause['conditions'].extend([
+                cond for cond in converted_clause['conditions']
+                if cond not in existing_clause['conditions']
+            ])
             
-            # Vérifier si la clause existe déjà
-            if clause_id in self.data['clauses']:
-                existing_clause = self.data['clauses'][clause_id]
-                
-                # Mettre à jour les champs existants
-                existing_clause['conditions'].extend([
-                    cond for cond in converted_clause['conditions']
-                    if cond not in existing_clause['conditions']
-                ])
-                
-                existing_clause['exceptions'].extend([
-                    exc for exc in converted_clause['exceptions']
-                    if exc not in existing_clause['exceptions']
-                ])
-                
-                existing_clause['mots_cles'].extend([
-                    kw for kw in converted_clause['mots_cles']
-                    if kw not in existing_clause['mots_cles']
-                ])
-                
-                # Ajouter la nouvelle source si elle n'existe pas déjà
-                if source_url:
-                    source_exists = any(
-                        s['url'] == source_url
-                        for s in existing_clause['sources']
-                    )
-                    if not source_exists:
-                        existing_clause['sources'].append({
-                            'url': source_url,
-                            'date_added': datetime.now().isoformat()
-                        })
-                
-                # Mettre à jour la date de modification
-                existing_clause['date_modification'] = datetime.now().isoformat()
-                print(f"✓ Clause mise à jour : {clause_id}")
-                
-            else:
-                # Ajouter la nouvelle clause
-                self.data['clauses'][clause_id] = converted_clause
-                print(f"✓ Nouvelle clause ajoutée : {clause_id}")
+            existing_clause['exceptions'].extend([
+                exc for exc in converted_clause['exceptions']
+                if exc not in existing_clause['exceptions']
+            ])
             
-            # Mettre à jour la date de dernière mise à jour
-            self.data['metadata']['last_update'] = datetime.now().isoformat()
+            existing_clause['mots_cles'].extend([
+                kw for kw in converted_clause['mots_cles']
+                if kw not in existing_clause['mots_cles']
+            ])
             
-            # Sauvegarder immédiatement
-            self.save_data()
-            return True
+            self.merge_references(existing_clause.setdefault('references', []),
+                                  converted_clause.get('references', []))
             
-        except Exception as e:
-            print(f"Erreur lors de la mise à jour de la clause : {str(e)}")
-            return False
+            # Ajouter la nouvelle source si elle n'existe pas déjà
+            if source_url:
+                source_exists = any(
+                    s['url'] == source_url
+                    for s in existing_clause['sources']
+                )
+                if not source_exists:
+                    existing_clause['sources'].append({
+                        'url': source_url,
+                        'date_added': datetime.now().isoformat()
+                    })
+            
+            # Mettre à jour la date de modification
+            existing_clause['date_modification'] = datetime.now().isoformat()
+            self.store.upsert(clause_id, existing_clause)
+            print(f"✓ Clause mise à jour : {clause_id}")
+            
+        else:
+            # Ajouter la nouvelle clause
+            self.store.upsert(clause_id, converted_clause)
+            print(f"✓ Nouvelle clause ajoutée : {clause_id}")
+        
+        # Mettre à jour la date de dernière mise à jour
+        self.data['metadata']['last_update'] = datetime.now().isoformat()
 
     def save_data(self):
-        """Sauvegarde les données dans le fichier JSON"""
-        with open('succession_data_unified.json', 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
+        """Fusionne le journal des modifications dans le fichier JSON"""
+        self.store.compact()
         print(f"✓ Données sauvegardées dans succession_data_unified.json")
 
-    async def run(self, queries, batch_size=10):
-        """Exécute le scraping avec traitement parallèle"""
-        total_results = []
+    @staticmethod
+    def merge_references(references, new_references):
+        """Ajoute les nouvelles références à la liste, sans doublon d'URL"""
+        if isinstance(new_references, (str, dict)):
+            new_references = [new_references]
+        
+        def key(reference):
+            return reference.get('url') if isinstance(reference, dict) else reference
+        
+        seen = {key(reference) for reference in references}
+        for reference in new_references:
+            if key(reference) not in seen:
+                references.append(reference)
+                seen.add(key(reference))
+        return references
+
+    def add_document_reference(self, clause, document):
+        """Ajoute le document d'origine aux références d'une clause Gemini"""
+        if 'references' not in clause:
+            clause['references'] = []
+        if document:
+            clause['references'].append({
+                'type': document.get('source', 'BOFiP'),
+                'url': document.get('url', ''),
+                'titre': document.get('title', '')
+            })
+
+    def build_pipeline(self, client, queries):
+        """Construit le pipeline récupération → parsing → analyse → conversion → enregistrement"""
+        loop = asyncio.get_running_loop()
+        pages = {}  # URL -> page de résultats de recherche en cours de traitement
+        
+        def page_done(result):
+            self.checkpoint.mark_fetched(result.query, result.source)
+            self.http_cache.mark_processed(result.url)
+            pages.pop(result.url, None)
         
+        def document_finished(document, analyzed):
+            """Fin de traitement d'un document ; la page n'est terminée que si tous ses
+            documents ont été analysés avec succès"""
+            page = pages.get(document['url'])
+            if page is None:
+                # Document BOFiP
+                if analyzed:
+                    self.http_cache.mark_processed(document['url'])
+                return
+            page['failed'] = page['failed'] or not analyzed
+            page['remaining'] -= 1
+            if page['remaining'] == 0:
+                if page['failed']:
+                    # Page à reprendre : ses documents en échec seront analysés à nouveau
+                    pages.pop(document['url'], None)
+                else:
+                    page_done(page['result'])
+        
+        def document_done(document):
+            """Toutes les clauses du document sont enregistrées"""
+            self.checkpoint.mark_analyzed(document)
+            document_finished(document, analyzed=True)
+        
+        async def fetch(item):
+            query, source_name, url = item
+            result = await self.fetch_page(client, url, source_name)
+            result.query = query
+            timing = self.fetch_timings.setdefault(source_name, {'pages': 0, 'seconds': 0.0})
+            timing['pages'] += 1
+            timing['seconds'] += result.elapsed
+            if not result.ok:
+                return None
+            if result.unchanged:
+                # Résultats identiques à ceux déjà analysés
+                page_done(result)
+                return None
+            return [result]
+        
+        async def parse(result):
+            # Chaque page est parsée une seule fois, par le parser de sa propre source
+            texts = await loop.run_in_executor(
+                self.parse_executor, parsers.parse_search_page, result.body, (result.source,), self.html_features
+            )
+            # Conserver la page d'origine de chaque extrait, sauf ceux déjà analysés
+            documents = [{'source': result.source, 'url': result.url, 'content': text} for text in texts]
+            documents = [doc for doc in documents if not self.checkpoint.is_analyzed(doc)]
+            if documents:
+                pages[result.url] = {'result': result, 'remaining': len(documents), 'failed': False}
+            else:
+                page_done(result)
+            return documents
+        
+        async def analyze(documents):
+            # Chaque document est transmis, même sans clause, pour marquer sa fin de
+            # traitement ; ses clauses valent None si l'analyse a échoué
+            return await self.analyze_content_batch(documents)
+        
+        async def convert(item):
+            document, clauses = item
+            if clauses is None:
+                return [(document, None)]
+            converted = []
+            for clause in clauses:
+                if not isinstance(clause, dict):
+                    continue
+                self.add_document_reference(clause, document)
+                result = self.convert_gemini_clause(clause, document['url'] if document else None)
+                if result:
+                    converted.append(result)
+            return [(document, converted)]
+        
+        async def persist(item):
+            document, converted = item
+            if converted is None:
+                document_finished(document, analyzed=False)
+                return None
+            source_url = document['url'] if document else None
+            for clause_id, converted_clause in converted:
+                try:
+                    self.merge_clause(clause_id, converted_clause, source_url)
+                except Exception as e:
+                    print(f"Erreur lors de la mise à jour de la clause : {str(e)}")
+            if document:
+                document_done(document)
+            return None
+        
+        workers = self.pipeline_workers
+        pipeline = Pipeline([
+            PipelineStage('récupération', fetch, workers['fetch'], self.pipeline_queue_size),
+            PipelineStage('parsing', parse, workers['parse'], self.pipeline_queue_size),
+            PipelineStage('analyse', analyze, workers['analyze'] or len(self.pool),
+                          self.pipeline_queue_size, batch_size=self.pack_max_documents),
+            PipelineStage('conversion', convert, workers['convert'], self.pipeline_queue_size),
+            # Un seul worker d'enregistrement : les fusions de clauses ne se chevauchent pas
+            PipelineStage('enregistrement', persist, 1, self.pipeline_queue_size)
+        ])
+        
+        async def produce_bofip(put):
+            # Documents crawlés lors d'une exécution interrompue, puis crawling en flux
+            for document in self.checkpoint.pending_bofip_documents():
+                await put(document)
+            await self.crawl_bofip(client, on_document=put)
+        
+        async def produce_queries(put):
+            for query in queries:
+                for source_name, source_info in self.sources.items():
+                    if source_name != 'bofip':  # BOFiP est parcouru par le crawler
+                        if self.checkpoint.is_fetched(query, source_name):
+                            continue
+                        url = source_info['search_url'].format(query=query)
+                        await put((query, source_name, url))
+        
+        pipeline.add_producer('analyse', produce_bofip)
+        pipeline.add_producer('récupération', produce_queries)
+        return pipeline
+
+    async def run(self, queries, resume=False):
+        """Exécute le scraping sous forme de pipeline en flux
+        
+        Le crawling BOFiP et les requêtes de recherche alimentent simultanément le
+        pipeline ; chaque étape a son propre groupe de workers.
+        
+        Args:
+            resume: Si True, reprend l'exécution précédente en ignorant les requêtes
+                    déjà traitées et les contenus déjà analysés
+        """
         print(f"\nDébut du scraping avec {len(queries)} requêtes...")
         print(f"Sources actives : {', '.join(self.sources.keys())}")
         
-        async with aiohttp.ClientSession() as session:
-            # D'abord, crawler BOFiP
-            bofip_results = await self.crawl_bofip(session)
-            if bofip_results:
-                print("\nAnalyse de BOFiP...")
-                clauses = await self.analyze_content_batch(bofip_results)
-                if clauses:
-                    for clause in clauses:
-                        # Ajouter la source BOFiP
-                        if 'references' not in clause:
-                            clause['references'] = []
-                        # Trouver le document source
-                        source_doc = next((doc for doc in bofip_results if any(ref in doc['content'] for ref in clause.get('references', []))), None)
-                        if source_doc:
-                            clause['references'].append({
-                                'type': 'BOFiP',
-                                'url': source_doc['url'],
-                                'titre': source_doc['title']
-                            })
-                        self.update_data(clause)
-            
-            # Traiter les requêtes par lots
-            for i in range(0, len(queries), batch_size):
-                batch = queries[i:i+batch_size]
-                print(f"\nTraitement du lot {i//batch_size + 1}/{(len(queries) + batch_size - 1)//batch_size}...")
-                
-                # Récupérer les résultats de toutes les sources en parallèle
-                tasks = []
-                for query in batch:
-                    for source_name, source_info in self.sources.items():
-                        if source_name != 'bofip':  # BOFiP est déjà traité
-                            url = source_info['search_url'].format(query=query)
-                            tasks.append(self.fetch_url(session, url, source_name))
-                
-                # Attendre tous les résultats
-                results = []
-                if tasks:
-                    for result in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Récupération des sources"):
-                        try:
-                            content = await result
-                            if content:
-                                results.append(content)
-                        except Exception as e:
-                            print(f"Erreur lors de la récupération : {str(e)}")
-                
-                # Parser les résultats
-                parsed_results = []
-                for content in results:
-                    for source_name, source_info in self.sources.items():
-                        if source_name != 'bofip':
-                            try:
-                                parsed = source_info['parser'](content)
-                                if parsed:
-                                    parsed_results.extend(parsed)
-                            except Exception as e:
-                                print(f"Erreur lors du parsing de {source_name}: {str(e)}")
-            
-                print(f"Contenus trouvés dans le lot : {len(parsed_results)}")
-                
-                if parsed_results:
-                    # Analyser le contenu avec Gemini
-                    clauses = await self.analyze_content_batch(parsed_results)
-                    if clauses:
-                        for clause in clauses:
-                            # Ajouter la source
-                            if 'references' not in clause:
-                                clause['references'] = []
-                            # Trouver le document source
-                            source_doc = next((doc for doc in parsed_results if any(ref in doc['content'] for ref in clause.get('references', []))), None)
-                            if source_doc:
-                                clause['references'].append({
-                                    'type': source_doc.get('source', 'Inconnu'),
-                                    'url': source_doc.get('url', ''),
-                                    'titre': source_doc.get('title', '')
-                                })
-                            self.update_data(clause)
-                else:
-                    print("✗ Aucun contenu trouvé dans ce lot")
-            
-            # Sauvegarder les données
-            self.save_data()
-            print(f"\n✓ Scraping terminé ! {len(total_results)} résultats analysés")
-            print(f"✓ Total final des clauses : {len(self.data['clauses'])}")
-            return total_results
+        if resume:
+            self.checkpoint.load()
+        else:
+            self.checkpoint.reset()
+        
+        self.fetch_timings = {}
+        with self.parsing_pool():
+            async with self.http as client:
+                pipeline = self.build_pipeline(client, queries)
+                await pipeline.run()
+        
+        # Sauvegarder les données
+        self.save_data()
+        self.checkpoint.close()
+        self.fingerprints.close()
+        pipeline.print_report()
+        self.fingerprints.print_report()
+        self.http_cache.print_report()
+        self.http.print_report()
+        self.pool.print_report()
+        if self.fetch_timings:
+            print("✓ Temps de récupération par source :")
+        for source_name, timing in self.fetch_timings.items():
+            print(f"  - {source_name} : {timing['pages']} pages, "
+                  f"{1000 * timing['seconds'] / timing['pages']:.0f} ms en moyenne")
+        print(f"\n✓ Scraping terminé ! {pipeline.stage('analyse').stats['in']} contenus analysés")
+        print(f"✓ Total final des clauses : {len(self.data['clauses'])}")
+        return pipeline.stages[-1].stats
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Scraper d'informations juridiques sur la succession")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reprendre l'exécution précédente sans refaire les requêtes et analyses terminées")
+    parser.add_argument('--offline', action='store_true',
+                        help="Rejouer les pages du cache HTTP sans accès réseau (benchmark)")
+    parser.add_argument('--lxml', action='store_true',
+                        help="Utiliser le parser lxml (plus rapide) s'il est installé, au lieu de html.parser")
+    args = parser.parse_args()
+    
     # Liste des requêtes de recherche
     search_queries = [
         # Requêtes de base
@@ -790,5 +975,5 @@ if __name__ == "__main__":
         "succession liquidation partage"
     ]
     
-    scraper = SuccessionScraper()
-    asyncio.run(scraper.run(search_queries))
+    scraper = SuccessionScraper(offline=args.offline, use_lxml=args.lxml)
+    asyncio.run(scraper.run(search_queries, resume=args.resume))
@@ -0,0 +1,29 @@
+import json
+import asyncio
+import llm_pool
+from analyze_data import SuccessionDataAnalyzer
+from test_llm_pool import RecordingAsyncClient
+
+class ScoreClient(RecordingAsyncClient):
+    text = '85'
+
+def test_comparisons_use_each_key_limiter(tmp_path, monkeypatch):
+    input_file = tmp_path / 'clauses.json'
+    input_file.write_text(json.dumps({'metadata': {'stats': {}}, 'clauses': {}}), encoding='utf-8')
+    monkeypatch.setenv('GEMINI_API_KEY_1', 'cle-a')
+    monkeypatch.setenv('GEMINI_API_KEY_2', 'cle-b')
+    for i in range(3, 6):
+        monkeypatch.delenv(f'GEMINI_API_KEY_{i}', raising=False)
+    monkeypatch.setattr(llm_pool.glm, 'GenerativeServiceAsyncClient', ScoreClient)
+    RecordingAsyncClient.calls = []
+
+    analyzer = SuccessionDataAnalyzer(str(input_file), requests_per_minute=6000)
+    assert [slot.client.api_key for slot in analyzer.pool.slots] == ['cle-a', 'cle-b']
+
+    clause = {'titre': 'Clause', 'description': 'Texte'}
+
+    async def run():
+        return [await analyzer.compare_clauses_async(clause, clause) for _ in range(2)]
+
+    assert asyncio.run(run()) == [85, 85]
+    assert RecordingAsyncClient.calls == ['cle-a', 'cle-b']
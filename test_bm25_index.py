@@ -0,0 +1,9 @@
+from bm25_index import BM25Index
+
+def test_average_length_follows_additions():
+    index = BM25Index()
+    index.add('a', {'titre': 'donation entre époux'})
+    index.add('b', {'description': 'clause de préciput au profit du conjoint survivant'})
+    index.add('c', {'titre': 'legs', 'mots_cles': ['usufruit', 'quotité disponible']})
+    assert index.avg_length == sum(index.doc_lengths) / len(index)
+    assert index.search('donation époux', top_k=1)[0][0] == 'a'
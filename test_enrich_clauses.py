@@ -0,0 +1,49 @@
+import json
+import asyncio
+from types import SimpleNamespace
+from clause_repository import ClauseRepository
+from enrich_clauses import ClauseEnricher
+
+ENRICHMENT_FIELDS = ['conditions_application', 'exigences_redaction', 'cas_usage', 'points_attention',
+                     'formulations_recommandees', 'pieges_eviter', 'documents_requis', 'delais_importants']
+
+class EnrichmentModel:
+    """Modèle factice : enrichissement minimal, appels comptés"""
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return SimpleNamespace(text=json.dumps({field: [] for field in ENRICHMENT_FIELDS}))
+
+def clause(titre, **extra):
+    return {'type': 'donation', 'titre': titre, 'description': f"Clause {titre}", 'conditions': [],
+            'exceptions': [], 'references': [], **extra}
+
+def test_only_pending_clauses_are_enriched(tmp_path):
+    input_file = tmp_path / 'clauses.json'
+    input_file.write_text(json.dumps({'clauses': {
+        'a': clause('Donation au dernier vivant'),
+        'b': clause('Donation-partage', date_enrichissement='2024-01-01T00:00:00')
+    }}), encoding='utf-8')
+    model = EnrichmentModel()
+    enricher = ClauseEnricher(str(input_file), requests_per_minute=6000, models=[model])
+
+    asyncio.run(enricher.enrich_all_clauses_async())
+    assert len(model.prompts) == 1 and 'Donation au dernier vivant' in model.prompts[0]
+    assert 'date_enrichissement' in enricher.data['clauses']['a']
+
+    repository = ClauseRepository.from_json(enricher.output_file, enricher.repository_path)
+    assert list(repository.pending_enrichment()) == []
+
+    asyncio.run(enricher.enrich_all_clauses_async())
+    assert len(model.prompts) == 1
+
+def test_prompt_accepts_document_references():
+    references = ['Article 1094-1 du Code civil',
+                  {'type': 'BOFiP', 'url': 'https://bofip.impots.gouv.fr/bofip/BOI-ENR-DMTG-10-10',
+                   'titre': 'Successions'}]
+    enricher = ClauseEnricher.__new__(ClauseEnricher)
+    prompt = enricher.enrichment_prompt(clause('Donation au dernier vivant', references=references))
+    assert ("Références: Article 1094-1 du Code civil, "
+            "Successions https://bofip.impots.gouv.fr/bofip/BOI-ENR-DMTG-10-10") in prompt
@@ -0,0 +1,125 @@
+import asyncio
+import google.ai.generativelanguage as glm
+import llm_pool
+from llm_pool import LLMClientPool, FakeClock
+
+class RecordingAsyncClient:
+    """Faux client du service Gemini : enregistre la clé API de chaque requête"""
+    calls = []
+    text = 'ok'
+
+    def __init__(self, client_options=None, **kwargs):
+        self.api_key = client_options['api_key']
+
+    async def generate_content(self, request, **kwargs):
+        RecordingAsyncClient.calls.append(self.api_key)
+        return glm.GenerateContentResponse(
+            candidates=[{'content': {'parts': [{'text': self.text}], 'role': 'model'}, 'finish_reason': 1}]
+        )
+
+def test_each_slot_sends_its_own_key(monkeypatch):
+    monkeypatch.setenv('GEMINI_API_KEY_1', 'cle-a')
+    monkeypatch.setenv('GEMINI_API_KEY_2', 'cle-b')
+    for i in range(3, 6):
+        monkeypatch.delenv(f'GEMINI_API_KEY_{i}', raising=False)
+    monkeypatch.setattr(llm_pool.glm, 'GenerativeServiceAsyncClient', RecordingAsyncClient)
+    RecordingAsyncClient.calls = []
+
+    pool = LLMClientPool.from_gemini_env(requests_per_minute=6000, clock=FakeClock())
+
+    async def run():
+        return [(await pool.generate(f"question {i}")).text for i in range(4)]
+
+    assert asyncio.run(run()) == ['ok'] * 4
+    assert RecordingAsyncClient.calls == ['cle-a', 'cle-b', 'cle-a', 'cle-b']
+
+class StubModel:
+    """Modèle factice : lève l'erreur prévue ou répond 'ok', appels comptés"""
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise Exception(self.error)
+        return 'ok'
+
+def make_pool(*models, **kwargs):
+    kwargs.setdefault('requests_per_minute', 6000)
+    return LLMClientPool(list(models), clock=FakeClock(), quarantine=10.0, **kwargs)
+
+def test_rate_limited_key_is_quarantined_with_doubling_backoff():
+    limited, working = StubModel('429 Resource has been exhausted (e.g. check quota)'), StubModel()
+    pool = make_pool(limited, working)
+    slot = pool.slots[0]
+
+    assert asyncio.run(pool.generate("question")) == 'ok'
+    assert slot.quarantined_until == 10.0
+    assert slot.stats['rate_limited'] == 1
+    # Clé en quarantaine : toutes les requêtes passent par l'autre clé
+    asyncio.run(pool.generate("question"))
+    asyncio.run(pool.generate("question"))
+    assert limited.calls == 1 and working.calls == 3
+
+    # Nouvelle erreur 429 à la sortie de quarantaine : durée doublée
+    pool.clock.current = 10.0
+    pool.current = 0
+    asyncio.run(pool.generate("question"))
+    assert limited.calls == 2
+    assert slot.quarantined_until == 10.0 + 20.0
+
+def test_expired_key_is_removed_for_good():
+    expired, working = StubModel('400 API key expired. Please renew the API key.'), StubModel()
+    pool = make_pool(expired, working)
+
+    assert asyncio.run(pool.generate("question")) == 'ok'
+    assert pool.slots[0].dead and len(pool) == 1
+    pool.clock.current = 1000.0
+    for _ in range(3):
+        asyncio.run(pool.generate("question"))
+    assert expired.calls == 1 and working.calls == 4
+
+    pool = make_pool(StubModel('API_KEY_INVALID'))
+    try:
+        asyncio.run(pool.generate("question"))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ValueError attendue quand toutes les clés sont retirées")
+
+def test_concurrency_limit_is_additive_increase_multiplicative_decrease():
+    pool = make_pool(StubModel(), max_concurrency=4)
+    slot = pool.slots[0]
+
+    async def run(errors):
+        for error in errors:
+            pool.release(await pool.acquire(), error)
+
+    asyncio.run(run([None, None, None]))
+    assert round(slot.limit, 2) == 2.9  # 1 → 2 → 2.5 → 2.9
+    asyncio.run(run([Exception('429 Too Many Requests')]))
+    assert round(slot.limit, 2) == 1.45
+    asyncio.run(run([None] * 50))
+    assert slot.limit == 4
+
+def test_acquire_serves_callers_in_arrival_order():
+    pool = make_pool(StubModel(), max_concurrency=1)
+    served = []
+
+    async def caller(name):
+        slot = await pool.acquire()
+        served.append(name)
+        await asyncio.sleep(0)
+        pool.release(slot)
+
+    async def run():
+        first = await pool.acquire()
+        tasks = [asyncio.create_task(caller(name)) for name in 'abcd']
+        await asyncio.sleep(0)
+        assert pool.waiting == 4
+        pool.release(first)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert served == list('abcd')
@@ -0,0 +1,24 @@
+import parsers
+from benchmark_parsers import FIXTURES_DIR, load_fixtures, legacy_extract_bofip_page
+
+CURRENT_URL = f"{parsers.BOFIP_BASE_URL}/bofip/1500-PGP"
+
+def test_boi_reference_not_glued_to_next_block():
+    html = "<html><body><div><p>Voir BOI-ENR-DMTG-10-10</p><p>20 mars 2019</p></div></body></html>"
+    _, new_urls = parsers.extract_bofip_page(html, CURRENT_URL)
+    assert list(new_urls) == [f"{parsers.BOFIP_BASE_URL}/bofip/BOI-ENR-DMTG-10-10"]
+
+def test_fixture_documents_match_legacy_extraction():
+    fixtures = load_fixtures(FIXTURES_DIR)
+    assert len(fixtures) == 4
+    for url, content in fixtures:
+        document, _ = parsers.extract_bofip_page(content, url)
+        legacy_document, _ = legacy_extract_bofip_page(content, url)
+        assert document == legacy_document
+
+def test_fixture_inline_reference_followed_by_date():
+    url = f"{parsers.BOFIP_BASE_URL}/bofip/BOI-ENR-DMTG-10-20"
+    with open(f"{FIXTURES_DIR}/BOI-ENR-DMTG-10-20.html", encoding='utf-8') as f:
+        _, new_urls = parsers.extract_bofip_page(f.read(), url)
+    assert f"{parsers.BOFIP_BASE_URL}/bofip/BOI-ENR-DMTG-10-60" in new_urls
+    assert f"{parsers.BOFIP_BASE_URL}/bofip/BOI-ENR-DMTG-10-6015" not in new_urls
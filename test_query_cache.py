@@ -0,0 +1,25 @@
+import os
+import numpy as np
+from query_cache import QueryEmbeddingCache
+
+def vector(value):
+    return np.full(4, value, dtype=np.float32)
+
+def test_disk_index_is_saved_in_batches(tmp_path):
+    path = str(tmp_path / 'queries')
+    index_path = os.path.join(path, 'index.json')
+    cache = QueryEmbeddingCache(path, dimension=4, save_every=3)
+    cache.put('modele', 'question 1', vector(1))
+    cache.put('modele', 'question 2', vector(2))
+    assert not os.path.exists(index_path)
+
+    cache.put('modele', 'question 3', vector(3))
+    assert os.path.exists(index_path)
+    assert cache.unsaved == 0
+
+    cache.put('modele', 'question 4', vector(4))
+    cache.save()
+    reloaded = QueryEmbeddingCache(path, dimension=4)
+    found, origin = reloaded.get('modele', 'Question 4 ?')
+    assert origin == 'disk'
+    assert np.allclose(found, vector(4))
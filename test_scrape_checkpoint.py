@@ -0,0 +1,16 @@
+from scrape_checkpoint import ScrapeCheckpoint
+
+def test_pending_documents_are_read_back_from_journal(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    documents = [{'url': f'https://bofip.impots.gouv.fr/bofip/{i}', 'content': f'Document {i}'}
+                 for i in range(3)]
+    checkpoint = ScrapeCheckpoint(path)
+    for document in documents:
+        checkpoint.add_bofip_document(document)
+    checkpoint.mark_analyzed(documents[1])
+    assert all(isinstance(digest, str) for digest in checkpoint.bofip_documents)
+    checkpoint.close()
+
+    resumed = ScrapeCheckpoint(path)
+    resumed.load()
+    assert list(resumed.pending_bofip_documents()) == [documents[0], documents[2]]
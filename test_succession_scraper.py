@@ -0,0 +1,193 @@
+import json
+import os
+import asyncio
+from types import SimpleNamespace
+import parsers
+from benchmark_parsers import FIXTURES_DIR
+from llm_pool import LLMClientPool
+from succession_scraper import SuccessionScraper
+
+class StubModel:
+    async def generate_content_async(self, prompt, **kwargs):
+        raise AssertionError("Aucun appel au modèle attendu")
+
+def make_scraper(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return SuccessionScraper(offline=True, pool=LLMClientPool([StubModel()]))
+
+def gemini_clause():
+    return {
+        'titre': 'Clause de préciput',
+        'texte': "Le conjoint survivant pourra prélever la résidence principale",
+        'explication': "Avantage matrimonial au profit du conjoint survivant",
+        'conditions': "Communauté de biens entre les époux",
+        'exceptions': "Action en retranchement des enfants d'un premier lit"
+    }
+
+def test_stored_clause_keeps_document_urls(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    documents = [
+        {'url': 'https://bofip.impots.gouv.fr/bofip/BOI-ENR-DMTG-10-10', 'title': 'Successions'},
+        {'url': 'https://bofip.impots.gouv.fr/bofip/BOI-ENR-DMTG-10-20', 'title': 'Liquidation'},
+        {'url': 'https://bofip.impots.gouv.fr/bofip/BOI-ENR-DMTG-10-10', 'title': 'Successions'}
+    ]
+    for document in documents:
+        clause = gemini_clause()
+        scraper.add_document_reference(clause, document)
+        clause_id, converted = scraper.convert_gemini_clause(clause, document['url'])
+        scraper.merge_clause(clause_id, converted, document['url'])
+
+    stored = scraper.store.data['clauses'][clause_id]
+    assert [reference['url'] for reference in stored['references']] == [
+        'https://bofip.impots.gouv.fr/bofip/BOI-ENR-DMTG-10-10',
+        'https://bofip.impots.gouv.fr/bofip/BOI-ENR-DMTG-10-20'
+    ]
+
+def test_parse_pool_only_open_during_run(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    assert scraper.parse_executor is None
+    assert scraper.html_features == parsers.HTML_PARSER
+
+    with scraper.parsing_pool() as executor:
+        with scraper.parsing_pool() as nested:
+            assert nested is executor
+        assert executor.submit(parsers.parse_bofip, '<html></html>').result() == []
+    assert scraper.parse_executor is None
+    assert executor._shutdown_thread
+
+    asyncio.run(scraper.run([]))
+    assert scraper.parse_executor is None
+
+def seed_bofip_cache(scraper):
+    """Place les pages BOFiP de test dans le cache HTTP (rejouées en mode hors ligne)"""
+    pages = {scraper.sources['bofip']['start_url']: 'BOI-ENR-DMTG-10-10'}
+    for boi in ('BOI-ENR-DMTG-10-20', 'BOI-ENR-DMTG-10-30', 'BOI-ENR-DMTG-10-40'):
+        pages[f"{parsers.BOFIP_BASE_URL}/bofip/{boi}"] = boi
+    for url, boi in pages.items():
+        with open(os.path.join(FIXTURES_DIR, f"{boi}.html"), encoding='utf-8') as f:
+            scraper.http_cache.store(url, 'bofip', f.read(), {})
+
+def test_streaming_crawl_does_not_collect_documents(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    seed_bofip_cache(scraper)
+    streamed = []
+
+    async def on_document(document):
+        streamed.append(document['url'])
+
+    assert asyncio.run(scraper.crawl_bofip(None, on_document=on_document)) == []
+    assert len(streamed) == 4
+
+    scraper = make_scraper(tmp_path, monkeypatch)
+    assert len(asyncio.run(scraper.crawl_bofip(None))) == 4
+
+class ScriptedModel:
+    """Modèle factice : renvoie la réponse prévue pour chaque appel"""
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(text=self.text)
+
+def test_empty_analysis_is_reused_but_failures_are_not(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    content = {'url': 'https://example.org/a', 'content': "Texte sans clause de succession. " * 400}
+
+    empty = ScriptedModel('{"clauses": []}')
+    scraper = SuccessionScraper(offline=True, pool=LLMClientPool([empty], requests_per_minute=6000))
+    scraper.max_content_chars = scraper.fingerprints.max_content_chars = 1000
+    assert asyncio.run(scraper.analyze_content_batch([content])) == [(content, [])]
+    assert asyncio.run(scraper.analyze_content_batch([content])) == [(content, [])]
+    assert empty.calls == 1
+    assert scraper.fingerprints.saved_chars == 1000
+    scraper.fingerprints.close()
+
+    other = dict(content, content="Autre texte. " * 400)
+    broken = ScriptedModel('pas de JSON')
+    scraper = SuccessionScraper(offline=True, pool=LLMClientPool([broken], requests_per_minute=6000))
+    assert asyncio.run(scraper.analyze_content_batch([other])) == [(other, None)]
+    asyncio.run(scraper.analyze_content_batch([other]))
+    assert broken.calls == 10
+
+class FakeHttp:
+    """Client HTTP factice : sert les pages prévues, 404 pour les autres"""
+    def __init__(self, pages):
+        self.pages = pages
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, url, headers=None):
+        body = self.pages.get(url)
+        return SimpleNamespace(status=200 if body else 404, text=body, headers={})
+
+    def print_report(self):
+        pass
+
+SEARCH_PAGE = """<html><body>
+<div class="article-item">Succession : le testament olographe doit être écrit en entier, daté et signé de la main
+du testateur, sans aucune intervention d'un tiers.</div>
+<div class="article-item">Succession : la réserve héréditaire des enfants limite la quotité disponible dont le
+défunt pouvait disposer librement par donation ou par testament.</div>
+</body></html>"""
+
+def run_online(tmp_path, model, resume=False):
+    scraper = SuccessionScraper(pool=LLMClientPool([model], requests_per_minute=6000))
+    url = scraper.sources['legifrance']['search_url'].format(query='testament')
+    scraper.http = FakeHttp({url: SEARCH_PAGE})
+    asyncio.run(scraper.run(['testament'], resume=resume))
+    return scraper, url
+
+def test_failed_analysis_does_not_mark_page_processed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    broken = ScriptedModel('pas de JSON')
+    scraper, url = run_online(tmp_path, broken)
+    assert broken.calls == 5
+    assert not scraper.http_cache.get(url)['processed']
+
+    working = ScriptedModel('{"clauses": []}')
+    scraper, url = run_online(tmp_path, working)
+    assert working.calls == 1
+    assert scraper.http_cache.get(url)['processed']
+
+def test_resume_analyzes_failed_documents_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scraper, _ = run_online(tmp_path, ScriptedModel('pas de JSON'))
+    assert not scraper.checkpoint.analyzed
+    assert not scraper.checkpoint.fetched
+
+    working = ScriptedModel('{"clauses": []}')
+    scraper, _ = run_online(tmp_path, working, resume=True)
+    assert working.calls == 1
+    assert len(scraper.checkpoint.analyzed) == 2
+
+def test_clauses_with_invalid_document_number_are_unassigned(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clauses = [dict(gemini_clause(), document=number) for number in (0, -1, 3, 'deux', 2)]
+    model = ScriptedModel(json.dumps({'clauses': clauses}))
+    scraper = SuccessionScraper(offline=True, pool=LLMClientPool([model], requests_per_minute=6000))
+    contents = [{'url': 'u1', 'content': 'premier'}, {'url': 'u2', 'content': 'second'}]
+
+    per_document, unassigned = asyncio.run(scraper.analyze_content_pack(contents))
+    assert [len(found) for found in per_document] == [0, 1]
+    assert len(unassigned) == 4
+
+def test_duplicates_in_batch_receive_clauses_of_first_copy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    model = ScriptedModel(json.dumps({'clauses': [gemini_clause()]}))
+    scraper = SuccessionScraper(offline=True, pool=LLMClientPool([model], requests_per_minute=6000))
+    text = "Le conjoint survivant bénéficie d'un droit viager au logement. " * 20
+    first = {'source': 'legifrance', 'url': 'https://example.org/a', 'content': text}
+    second = {'source': 'service_public', 'url': 'https://example.org/b', 'content': text}
+
+    results = asyncio.run(scraper.analyze_content_batch([first, second]))
+    assert model.calls == 1
+    assert [(document['url'], len(clauses)) for document, clauses in results] == [
+        ('https://example.org/a', 1), ('https://example.org/b', 1)
+    ]
+    assert results[0][1][0] is not results[1][1][0]
@@ -0,0 +1,58 @@
+import numpy as np
+from vector_store import VectorStore
+from local_index import LocalVectorIndex
+
+class CountingStore(VectorStore):
+    """VectorStore dont les embeddings sont calculés localement et comptés"""
+    def create_embeddings(self, texts):
+        self.embedded.extend(texts)
+        return [np.full(1536, len(self.embedded), dtype=np.float32) for _ in texts]
+
+def make_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = CountingStore(cache_path=str(tmp_path / 'cache'), backend='local',
+                          local_index_path=str(tmp_path / 'index'), client=object(),
+                          query_cache_path=str(tmp_path / 'queries'))
+    store.embedded = []
+    return store
+
+def clause(titre, contenu):
+    return {'titre': titre, 'type': 'clause', 'description': contenu, 'contenu': contenu}
+
+def test_identical_texts_share_one_embedding(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    store.upsert_clauses({'a': clause('Titre', 'Texte commun'), 'b': clause('Titre', 'Texte commun')})
+    assert len(store.embedded) == 1
+    assert store.index.describe_index_stats()['total_vector_count'] == 2
+
+def test_metadata_change_reupserts_without_embedding(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    clauses = {'a': clause('Titre', 'Texte')}
+    store.upsert_clauses(clauses)
+    assert len(store.embedded) == 1
+
+    upserted = []
+    original_upsert = store.index.upsert
+    store.index.upsert = lambda vectors, **kwargs: (upserted.extend(vectors), original_upsert(vectors, **kwargs))[1]
+
+    # Métadonnées modifiées sans changement du texte préparé
+    store.clause_metadata = lambda clause_id, c: {**VectorStore.clause_metadata(store, clause_id, c), 'note': 'nouvelle'}
+    store.upsert_clauses(clauses)
+    assert len(store.embedded) == 1
+    assert [vector_id for vector_id, _, _ in upserted] == ['a']
+
+    upserted.clear()
+    store.upsert_clauses(clauses)
+    assert upserted == []
+
+def test_recreated_index_is_filled_again(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    clauses = {'a': clause('Titre', 'Texte'), 'b': clause('Autre titre', 'Autre texte')}
+    store.upsert_clauses(clauses)
+
+    # Répertoire de l'index local supprimé : le journal des insertions n'est plus fiable
+    store = make_store(tmp_path, monkeypatch)
+    store.index = LocalVectorIndex(str(tmp_path / 'nouvel_index'), dimension=1536)
+    store.upsert_clauses(clauses)
+    assert store.embedded == []
+    assert store.index.describe_index_stats()['total_vector_count'] == 2
@@ -1,18 +1,75 @@
 import os
 import json
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
 from openai import OpenAI
 from typing import List, Dict, Any
+from clause_repository import ClauseRepository
+from embedding_cache import EmbeddingCache
+from query_cache import QueryEmbeddingCache
+from local_index import LocalVectorIndex
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from clause_features import FeatureCache
 
 load_dotenv()
 
 class VectorStore:
-    def __init__(self):
-        # Initialiser Pinecone
-        self.pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+    # Client Pinecone et index dont l'existence a déjà été vérifiée, partagés par toutes les instances
+    _pinecone_client = None
+    _known_indexes = set()
+
+    def __init__(self, cache_path: str = 'embedding_cache', cache_max_entries: int = 50000,
+                 backend: str = None, local_index_path: str = 'local_index', client: OpenAI = None,
+                 lexical_source: str = 'succession_data_unified.json',
+                 query_cache_path: str = 'query_embedding_cache', query_cache_ttl: int = 30 * 86400):
+        """
+        Args:
+            backend: 'pinecone' ou 'local' (par défaut la variable VECTOR_BACKEND, sinon 'pinecone')
+            local_index_path: Répertoire de l'index local
+            client: Client OpenAI existant à réutiliser pour les embeddings
+            lexical_source: Fichier des clauses utilisé pour construire l'index BM25
+            query_cache_path: Répertoire du cache des embeddings de requêtes
+            query_cache_ttl: Durée de validité (secondes) d'un embedding de requête en cache
+        """
         self.index_name = "succession-clauses"
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = client or OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.embedding_model = "text-embedding-ada-002"
+        
+        # Cache disque des embeddings des clauses
+        self.cache = EmbeddingCache(cache_path, dimension=1536, max_entries=cache_max_entries)
+        
+        # Cache des embeddings de requêtes (LRU mémoire + disque)
+        self.query_cache = QueryEmbeddingCache(query_cache_path, dimension=1536, ttl=query_cache_ttl)
+        
+        # Caractéristiques des clauses (mots-clés, cas d'usage) par hash de contenu
+        self.features = FeatureCache()
+        
+        # Index lexical BM25, construit au premier usage
+        self.lexical_source = lexical_source
+        self._lexical_index = None
+        
+        self.backend = backend or os.getenv('VECTOR_BACKEND', 'pinecone')
+        if self.backend == 'local':
+            # Index NumPy en mémoire, même interface upsert/query que Pinecone
+            self.pc = None
+            self.index = LocalVectorIndex(local_index_path, dimension=1536)
+        elif self.backend == 'pinecone':
+            self.index = self.connect_pinecone()
+        else:
+            raise ValueError(f"Backend vectoriel inconnu : {self.backend}")
+
+    def connect_pinecone(self):
+        """Se connecte à l'index Pinecone, en le créant s'il n'existe pas"""
+        if VectorStore._pinecone_client is None:
+            VectorStore._pinecone_client = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+        self.pc = VectorStore._pinecone_client
+        
+        if self.index_name in VectorStore._known_indexes:
+            return self.pc.Index(self.index_name)
         
         # Créer l'index s'il n'existe pas
         if self.index_name not in self.pc.list_indexes().names():
@@ -25,73 +82,69 @@ class VectorStore:
                     region='us-east-1'
                 )
             )
-        self.index = self.pc.Index(self.index_name)
+        VectorStore._known_indexes.add(self.index_name)
+        return self.pc.Index(self.index_name)
 
     def create_embedding(self, text: str) -> List[float]:
         """Crée un embedding à partir d'un texte"""
         response = self.client.embeddings.create(
             input=text,
-            model="text-embedding-ada-002"
+            model=self.embedding_model
         )
         return response.data[0].embedding
 
+    def embed_query(self, text: str):
+        """Embedding d'une requête, servi par le cache des requêtes si possible
+        
+        Returns:
+            (vecteur, origine) avec origine 'memory', 'disk' ou 'api'
+        """
+        return self.query_cache.embed(self.embedding_model, text, self.create_embedding)
+
+    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Crée les embeddings d'une liste de textes en une seule requête"""
+        response = self.client.embeddings.create(
+            input=texts,
+            model=self.embedding_model
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Estimation grossière du nombre de tokens (environ 4 caractères par token)"""
+        return len(text) // 4 + 1
+
+    def make_batches(self, items: List[tuple], max_texts: int, max_tokens: int):
+        """Découpe les (id, texte, métadonnées) en lots d'au plus max_texts textes et max_tokens tokens"""
+        batch = []
+        batch_tokens = 0
+        for item in items:
+            tokens = self.estimate_tokens(item[1])
+            if batch and (len(batch) >= max_texts or batch_tokens + tokens > max_tokens):
+                yield batch
+                batch = []
+                batch_tokens = 0
+            batch.append(item)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def load_features(self, repository: ClauseRepository):
+        """Reprend les caractéristiques précalculées stockées dans le dépôt de clauses"""
+        for _, features in repository.iter_features():
+            self.features.features[features['content_hash']] = features
+
     def _extract_keywords(self, clause: Dict[str, Any]) -> List[str]:
         """Extrait les mots-clés pertinents d'une clause"""
-        keywords = set()
-        
-        # Extraire les mots significatifs du titre
-        title_words = clause.get('titre', '').lower().split()
-        keywords.update(w for w in title_words if len(w) > 3)
-        
-        # Ajouter le type comme mot-clé
-        if 'type' in clause:
-            keywords.add(clause['type'].lower())
-        
-        # Extraire les termes juridiques courants
-        legal_terms = {
-            'succession', 'heritage', 'testament', 'legs', 'donation',
-            'usufruit', 'nue-propriete', 'reserve', 'quotite', 'partage',
-            'conjoint', 'enfant', 'descendant', 'ascendant', 'heritier'
-        }
-        
-        description = clause.get('description', '').lower()
-        keywords.update(term for term in legal_terms if term in description)
-        
-        return list(keywords)
+        return self.features.get(clause)['keywords']
 
     def _get_use_cases(self, clause: Dict[str, Any]) -> str:
         """Détermine les cas d'usage typiques pour une clause"""
-        use_cases = []
-        
-        # Analyser le titre et la description
-        text = f"{clause.get('titre', '')} {clause.get('description', '')}".lower()
-        
-        # Détecter les cas d'usage courants
-        cases = {
-            'enfant': "protection des enfants",
-            'conjoint': "protection du conjoint survivant",
-            'remariage': "cas de remariage",
-            'entreprise': "transmission d'entreprise",
-            'mineur': "présence d'héritiers mineurs",
-            'handicap': "héritiers en situation de handicap",
-            'étranger': "biens situés à l'étranger",
-            'donation': "donations antérieures",
-            'testament': "présence d'un testament",
-            'usufruit': "démembrement de propriété"
-        }
-        
-        for keyword, case in cases.items():
-            if keyword in text:
-                use_cases.append(case)
-        
-        # Si aucun cas spécifique n'est trouvé
-        if not use_cases:
-            use_cases.append("cas général de succession")
-        
-        return ", ".join(use_cases)
+        return self.features.get(clause)['use_cases']
 
     def prepare_clause_text(self, clause: Dict[str, Any]) -> str:
         """Prépare le texte d'une clause pour l'embedding avec un contexte enrichi"""
+        features = self.features.get(clause)
         # Ajouter plus de contexte
         context_parts = [
             f"Cette clause concerne {clause.get('titre', '').lower()}.",
@@ -99,10 +152,10 @@ class VectorStore:
             f"En résumé : {clause.get('description', '')}",
             
             # Ajouter des mots-clés explicites
-            "Mots-clés pertinents : " + ", ".join(self._extract_keywords(clause)),
+            "Mots-clés pertinents : " + ", ".join(features['keywords']),
             
             # Ajouter des cas d'usage
-            "Applicable dans les cas suivants : " + self._get_use_cases(clause),
+            "Applicable dans les cas suivants : " + features['use_cases'],
             
             # Structurer les conditions
             "Conditions requises :",
@@ -111,10 +164,17 @@ class VectorStore:
         
         return "\n".join(context_parts)
 
+    def clause_metadata(self, clause_id: str, clause: Dict[str, Any]) -> Dict[str, Any]:
+        """Métadonnées stockées avec le vecteur d'une clause"""
+        return {
+            "titre": clause.get('titre', ''),
+            "type": clause.get('type', ''),
+            "description": clause.get('description', '')[:512],  # Limiter la taille
+            "original_id": clause_id  # Garder l'ID original dans les métadonnées
+        }
+
     def clean_id(self, id_str: str) -> str:
         """Nettoie un ID pour le rendre compatible avec Pinecone (ASCII uniquement)"""
-        import unicodedata
-        
         # Normaliser les caractères Unicode (décomposer les caractères accentués)
         normalized = unicodedata.normalize('NFKD', id_str)
         
@@ -132,10 +192,40 @@ class VectorStore:
             
         return clean_id
 
-    def upsert_clauses(self, clauses: Dict[str, Any]):
-        """Insère ou met à jour les clauses dans Pinecone"""
-        batch_size = 100
-        vectors = []
+    def index_matches_ledger(self) -> bool:
+        """Vérifie que l'index contient au moins les vecteurs notés comme insérés
+        
+        Le journal des insertions est conservé avec le cache d'embeddings : il ne reflète
+        plus l'index si celui-ci a été recréé ou si le répertoire de l'index local a été supprimé.
+        """
+        prefix = f"{self.backend}/"
+        recorded = sum(1 for vector_id in self.cache.upserted if vector_id.startswith(prefix))
+        if not recorded:
+            return True
+        stats = self.index.describe_index_stats()
+        return stats['total_vector_count'] >= recorded
+
+    def upsert_clauses(self, clauses: Dict[str, Any], batch_size: int = 100,
+                       max_batch_tokens: int = 50000, max_workers: int = 4, force: bool = False):
+        """Insère ou met à jour les clauses dans l'index vectoriel
+        
+        Le cache d'embeddings est indexé par le modèle et le texte préparé seul : des clauses
+        au texte identique partagent un vecteur, et un changement de métadonnées ne provoque
+        pas de nouvel embedding. Un second hash (texte + métadonnées) détermine les clauses
+        à réinsérer dans l'index.
+        
+        Args:
+            batch_size: Nombre maximum de textes par requête d'embedding
+            max_batch_tokens: Nombre maximum (estimé) de tokens par requête d'embedding
+            max_workers: Nombre de requêtes d'embedding simultanées
+            force: Si True, réinsère toutes les clauses même inchangées
+        """
+        items = []
+        unchanged = 0
+
+        if not force and not self.index_matches_ledger():
+            print("⚠️ L'index ne contient pas les clauses déjà insérées, réinsertion complète")
+            self.cache.forget_upserted(f"{self.backend}/")
 
         print("Préparation des embeddings...")
         for clause_id, clause in clauses.items():
@@ -143,36 +233,123 @@ class VectorStore:
             if clause_id == "metadata":
                 continue
 
-            # Nettoyer l'ID
-            clean_clause_id = self.clean_id(clause_id)
-            
-            # Préparer le texte et créer l'embedding
-            text = self.prepare_clause_text(clause)
-            vector = self.create_embedding(text)
-            
+            # Les clauses au format unifié ont leur contenu sous la clé 'content'
+            clause = clause.get('content', clause)
+
             # Préparer les métadonnées
-            metadata = {
-                "titre": clause.get('titre', ''),
-                "type": clause.get('type', ''),
-                "description": clause.get('description', '')[:512],  # Limiter la taille
-                "original_id": clause_id  # Garder l'ID original dans les métadonnées
-            }
-            
-            vectors.append((clean_clause_id, vector, metadata))
+            metadata = self.clause_metadata(clause_id, clause)
             
-            # Insérer par lots
-            if len(vectors) >= batch_size:
-                self.index.upsert(vectors=vectors)
-                print(f"Lot de {batch_size} clauses inséré...")
-                vectors = []
+            clean_clause_id = self.clean_id(clause_id)
+            text = self.prepare_clause_text(clause)
+            key = EmbeddingCache.make_key(self.embedding_model, text)
+            # Le hash d'indexation dépend aussi des métadonnées pour réinsérer une clause
+            # dont seul le titre change
+            digest = EmbeddingCache.make_key(self.embedding_model, text + json.dumps(metadata, ensure_ascii=False))
+            if not force and self.cache.is_upserted(f"{self.backend}/{clean_clause_id}", digest):
+                unchanged += 1
+                continue
+            items.append((clean_clause_id, text, metadata, key, digest))
+
+        # Vecteurs déjà en cache : pas d'appel à l'API ; un seul embedding par texte
+        cached = []
+        pending = {}  # clé d'embedding -> clauses en attente de ce vecteur
+        for item in items:
+            if item[3] in pending:
+                pending[item[3]].append(item)
+                continue
+            vector = self.cache.get(item[3])
+            if vector is None and self.cache.created_at(item[4]) is not None:
+                # Entrée d'un cache indexé par texte + métadonnées (ancien format)
+                vector = self.cache.get(item[4])
+                self.cache.put(item[3], vector)
+            if vector is None:
+                pending[item[3]] = [item]
+            else:
+                cached.append((item, vector))
+        misses = [group[0] for group in pending.values()]
+
+        batches = list(self.make_batches(misses, batch_size, max_batch_tokens))
+        print(f"{unchanged} clauses inchangées ignorées, {len(cached)} embeddings en cache")
+        print(f"{len(misses)} textes répartis en {len(batches)} requêtes d'embedding")
+
+        # Les embeddings sont calculés en parallèle ; l'insertion d'un lot dans Pinecone
+        # se fait pendant le calcul des lots suivants
+        with ThreadPoolExecutor(max_workers=max_workers) as embed_pool, \
+                ThreadPoolExecutor(max_workers=1) as upsert_pool:
+            in_flight = deque()
+            upserts = []
+
+            def submit_upsert(batch_with_vectors):
+                vectors = [(item[0], vector, item[2]) for item, vector in batch_with_vectors]
+                future = upsert_pool.submit(self.index.upsert, vectors=vectors)
+                upserts.append((future, [(item[0], item[4]) for item, _ in batch_with_vectors]))
+
+            def flush_oldest():
+                batch, future = in_flight.popleft()
+                vectors = future.result()
+                batch_with_vectors = []
+                for item, vector in zip(batch, vectors):
+                    self.cache.put(item[3], vector)
+                    batch_with_vectors.extend((same_text, vector) for same_text in pending[item[3]])
+                submit_upsert(batch_with_vectors)
+
+            for start in range(0, len(cached), batch_size):
+                submit_upsert(cached[start:start + batch_size])
+
+            for batch in batches:
+                in_flight.append((batch, embed_pool.submit(self.create_embeddings, [item[1] for item in batch])))
+                if len(in_flight) >= max_workers:
+                    flush_oldest()
+            while in_flight:
+                flush_oldest()
+
+            for i, (future, keys) in enumerate(upserts, 1):
+                future.result()
+                for vector_id, digest in keys:
+                    self.cache.mark_upserted(f"{self.backend}/{vector_id}", digest)
+                print(f"Lot {i}/{len(upserts)} inséré...")
 
-        # Insérer le dernier lot
-        if vectors:
-            self.index.upsert(vectors=vectors)
-            print(f"Dernier lot de {len(vectors)} clauses inséré.")
+        self.cache.save()
+        self.cache.print_report()
+
+    def build_lexical_index(self, clauses: Dict[str, Any]) -> BM25Index:
+        """Construit l'index BM25 (titre, description, mots-clés, cas d'usage) des clauses"""
+        index = BM25Index()
+        for clause_id, clause in clauses.items():
+            if clause_id == "metadata":
+                continue
+            features = self.features.get(clause)
+            clause = clause.get('content', clause)
+            index.add(
+                self.clean_id(clause_id),
+                {
+                    'titre': clause.get('titre', ''),
+                    'description': clause.get('description', ''),
+                    'mots_cles': clause.get('mots_cles') or features['keywords'],
+                    'cas_usage': features['use_cases']
+                },
+                self.clause_metadata(clause_id, clause)
+            )
+        print(f"✓ Index lexical construit : {len(index)} clauses, {len(index.postings)} termes")
+        self._lexical_index = index
+        return index
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        """Index BM25 local, construit une seule fois au premier usage"""
+        if self._lexical_index is None:
+            repository = ClauseRepository.from_json(self.lexical_source)
+            self.load_features(repository)
+            self.build_lexical_index(dict(repository.iter_clauses()))
+        return self._lexical_index
 
     def search_clauses(self, query: str, top_k: int = 5, min_score: float = 0.7) -> List[Dict[str, Any]]:
-        """Recherche les clauses les plus pertinentes avec des paramètres améliorés"""
+        """Recherche hybride : similarité vectorielle et BM25 local fusionnés par rang (RRF)
+        
+        Les résultats vectoriels sous min_score ne participent pas au classement vectoriel,
+        mais une clause peut être retenue par la seule recherche lexicale. Chaque résultat
+        porte les diagnostics de la recherche (origine de l'embedding, compteurs du cache).
+        """
         # Enrichir la requête avec du contexte
         enriched_query = f"""
         Recherche de clauses pour : {query}
@@ -184,76 +361,77 @@ class VectorStore:
         - Obligations légales
         """
         
-        # Créer l'embedding de la requête enrichie
-        query_embedding = self.create_embedding(enriched_query)
+        # Embedding de la requête enrichie (sans appel à l'API si elle est en cache)
+        start = time.perf_counter()
+        query_embedding, embedding_origin = self.embed_query(enriched_query)
+        diagnostics = {
+            "embedding_origin": embedding_origin,
+            "embedding_ms": round(1000 * (time.perf_counter() - start), 2),
+            "query_cache": self.query_cache.diagnostics()
+        }
         
-        # Rechercher dans Pinecone avec des paramètres avancés
+        # Rechercher dans l'index avec des paramètres avancés
         results = self.index.query(
             vector=query_embedding,
-            top_k=top_k * 2,  # Demander plus de résultats pour filtrer ensuite
+            top_k=top_k * 2,  # Demander plus de résultats pour la fusion
             include_metadata=True
         )
+        vector_matches = {match.id: match for match in results.matches if match.score >= min_score}
         
-        # Filtrer et formater les résultats
-        filtered_results = []
-        for match in results.matches:
-            if match.score < min_score:
-                continue
-                
-            # Calculer un score de pertinence basé sur les mots-clés
-            pertinence = self._evaluate_pertinence(query, match.metadata)
-            
-            result = {
-                "id": match.id,
-                "score": match.score,
-                "metadata": match.metadata,
-                "pertinence": pertinence,
-                "combined_score": match.score * pertinence  # Score combiné
-            }
-            filtered_results.append(result)
-        
-        # Trier par score combiné
-        filtered_results.sort(key=lambda x: x["combined_score"], reverse=True)
-        
-        return filtered_results[:top_k]
-
-    def _evaluate_pertinence(self, query: str, metadata: Dict[str, Any]) -> float:
-        """Évalue la pertinence d'une clause par rapport à la requête"""
-        score = 1.0
-        query = query.lower()
+        # Recherche lexicale locale (la requête d'origine, sans le contexte ajouté)
+        lexical_matches = {doc_id: (score, metadata)
+                           for doc_id, score, metadata in self.lexical_index.search(query, top_k * 2)}
         
-        # Vérifier la présence de mots-clés de la requête dans le titre
-        if metadata.get("titre"):
-            title_matches = sum(1 for word in query.split() if word in metadata["titre"].lower())
-            score *= (1 + 0.2 * title_matches)  # Bonus de 20% par mot trouvé dans le titre
+        fused = reciprocal_rank_fusion([list(vector_matches), list(lexical_matches)])
         
-        # Vérifier la description
-        if metadata.get("description"):
-            desc_matches = sum(1 for word in query.split() if word in metadata["description"].lower())
-            score *= (1 + 0.1 * desc_matches)  # Bonus de 10% par mot trouvé dans la description
+        filtered_results = []
+        for doc_id, combined_score in fused[:top_k]:
+            match = vector_matches.get(doc_id)
+            lexical_score, lexical_metadata = lexical_matches.get(doc_id, (0.0, None))
+            filtered_results.append({
+                "id": doc_id,
+                "score": match.score if match else 0.0,
+                "metadata": match.metadata if match else lexical_metadata,
+                "lexical_score": lexical_score,
+                "combined_score": combined_score,
+                "diagnostics": diagnostics
+            })
         
-        return score
+        return filtered_results
 
-def init_vector_store(index_data: bool = False):
+def init_vector_store(index_data: bool = False, backend: str = None, client: OpenAI = None,
+                      force: bool = False):
     """Initialise le vector store
     
     Args:
         index_data: Si True, réindexe toutes les données. Si False, se connecte uniquement à l'index existant.
+        backend: 'pinecone' ou 'local' (voir VectorStore)
+        client: Client OpenAI existant à réutiliser pour les embeddings
+        force: Avec index_data, réinsère toutes les clauses même inchangées
     """
-    store = VectorStore()
+    store = VectorStore(backend=backend, client=client)
     
     if index_data:
         print("Démarrage de l'indexation des clauses...")
-        with open('succession_data_unified.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        store.upsert_clauses(data['clauses'])
+        repository = ClauseRepository.from_json('succession_data_unified.json')
+        store.load_features(repository)
+        store.upsert_clauses(dict(repository.iter_clauses()), force=force)
         print("Indexation terminée !")
     
     return store
 
 if __name__ == "__main__":
-    # Test de la recherche avec l'index existant
-    store = init_vector_store(index_data=False)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Indexation et recherche des clauses de succession")
+    parser.add_argument('--index', action='store_true',
+                        help="Réindexer les clauses avant les recherches de test")
+    parser.add_argument('--force', action='store_true',
+                        help="Avec --index, réinsérer toutes les clauses même inchangées")
+    args = parser.parse_args()
+    
+    # Test de la recherche (avec l'index existant, sauf --index)
+    store = init_vector_store(index_data=args.index, force=args.force)
     print("\nTest de recherche avec les nouveaux paramètres :")
     
     # Test avec différentes requêtes
@@ -270,6 +448,8 @@ if __name__ == "__main__":
         for r in results:
             print(f"\nClause: {r['metadata']['titre']}")
             print(f"Score vectoriel: {r['score']:.3f}")
-            print(f"Score de pertinence: {r['pertinence']:.3f}")
-            print(f"Score combiné: {r['combined_score']:.3f}")
+            print(f"Score BM25: {r['lexical_score']:.3f}")
+            print(f"Score combiné (RRF): {r['combined_score']:.4f}")
             print(f"Description: {r['metadata']['description'][:200]}...")
+    
+    store.query_cache.print_report()